@@ -0,0 +1,4 @@
+from .checkpoint import CheckpointStore
+from .runner import BatchRunner
+
+__all__ = ["BatchRunner", "CheckpointStore"]
@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import time
+from typing import Optional
+from payment_service.commons import PaymentResponse
+
+
+class CheckpointStore:
+    """Progress of a billing run in SQLite, keyed by (run_id, item key).
+
+    process_batch uses the row index as item key; the recurring scheduler uses each
+    period's idempotency key.
+
+    Completed items are buffered in memory and written in one transaction every
+    'flush_every' items or 'flush_interval' seconds, so a checkpoint costs a list append
+    per charge. Items still in the buffer when the process dies are charged again on
+    resume, which is safe because each item's charge keeps the same idempotency key.
+    Retryable failures are never recorded, so a resumed run retries them.
+    """
+
+    def __init__(self, path: str, run_id: str, flush_every: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.run_id = run_id
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                transaction_id TEXT,
+                amount REAL NOT NULL,
+                PRIMARY KEY (run_id, item_key)
+            ) WITHOUT ROWID"""
+        )
+        self._completed: dict[str, tuple[str, Optional[str], float]] = {
+            item_key: (status, transaction_id, amount)
+            for item_key, status, transaction_id, amount in self._connection.execute(
+                "SELECT item_key, status, transaction_id, amount FROM checkpoints WHERE run_id = ?", (run_id,)
+            )
+        }
+        self._pending: list[tuple[str, str, str, Optional[str], float]] = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def completed(self, item_key: str) -> Optional[PaymentResponse]:
+        """The recorded outcome of an item finished by this or a previous run, if any."""
+        entry = self._completed.get(item_key)
+        if entry is None:
+            return None
+        status, transaction_id, amount = entry
+        return PaymentResponse(
+            status=status,
+            amount=amount,
+            transaction_id=transaction_id,
+            message="Skipped: completed in a previous run",
+        )
+
+    def mark_done(self, item_key: str, response: PaymentResponse):
+        if response.retryable:
+            return
+        with self._lock:
+            self._completed[item_key] = (response.status, response.transaction_id, response.amount)
+            self._pending.append((self.run_id, item_key, response.status, response.transaction_id, response.amount))
+            if len(self._pending) >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> "CheckpointStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_locked(self):
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)", self._pending)
+        self._pending.clear()
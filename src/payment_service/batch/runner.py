@@ -0,0 +1,63 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchRunner:
+    """Runs a function over a stream of items on a worker pool.
+
+    At most 'max_in_flight' items are submitted at once, so arbitrarily large
+    inputs are consumed lazily with bounded memory.
+    """
+    max_workers: int = 8
+    max_in_flight: Optional[int] = None
+
+    def __post_init__(self):
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if self.max_in_flight is not None and self.max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+    @property
+    def in_flight_limit(self) -> int:
+        return self.max_in_flight or self.max_workers * 2
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T], ordered: bool = True) -> Iterator[tuple[int, R]]:
+        """Yield (index, result) for every item, in input order or as completed."""
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch")
+        try:
+            if ordered:
+                yield from self._map_ordered(executor, fn, items)
+            else:
+                yield from self._map_as_completed(executor, fn, items)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _map_ordered(self, executor: ThreadPoolExecutor, fn, items) -> Iterator[tuple[int, R]]:
+        pending: deque[tuple[int, Future]] = deque()
+        for index, item in enumerate(items):
+            pending.append((index, executor.submit(fn, item)))
+            if len(pending) >= self.in_flight_limit:
+                done_index, future = pending.popleft()
+                yield done_index, future.result()
+        while pending:
+            done_index, future = pending.popleft()
+            yield done_index, future.result()
+
+    def _map_as_completed(self, executor: ThreadPoolExecutor, fn, items) -> Iterator[tuple[int, R]]:
+        pending: dict[Future, int] = {}
+        for index, item in enumerate(items):
+            pending[executor.submit(fn, item)] = index
+            if len(pending) >= self.in_flight_limit:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
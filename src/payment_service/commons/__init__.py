@@ -1,4 +1,5 @@
 from .contact import ContactInfo
+from .deadline import Deadline, current_deadline, deadline_scope
 from .customer import CustomerData
 from .payment_data import PaymentData
 from .payment_response import PaymentResponse
@@ -7,7 +8,10 @@ from .payment_data import PaymentType
 __all__ = [
     "ContactInfo",
     "CustomerData",
+    "Deadline",
     "PaymentData",
     "PaymentResponse",
     "PaymentType",
+    "current_deadline",
+    "deadline_scope",
 ]
\ No newline at end of file
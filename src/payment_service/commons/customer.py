@@ -6,3 +6,7 @@ class CustomerData(BaseModel):
     name: str
     contact_info: ContactInfo
     customer_id: Optional[str] = None
+    # Stripe customer holding a saved card; set by RecurringScheduler so recurring charges bill that card.
+    stripe_customer_id: Optional[str] = None
+    # Preferred language for receipts, e.g. 'es' or 'pt-BR'; None uses the catalog default.
+    locale: Optional[str] = None
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Union
+
+
+class Deadline:
+    """A point in monotonic time by which a transaction must finish."""
+
+    def __init__(self, expires_at: float, budget: float):
+        self.expires_at = expires_at
+        self.budget = budget
+
+    @classmethod
+    def after(cls, timeout: float) -> "Deadline":
+        return cls(time.monotonic() + timeout, timeout)
+
+    @classmethod
+    def coerce(cls, value: Union["Deadline", float, None]) -> Optional["Deadline"]:
+        """Accept a Deadline, a timeout in seconds, or None (no budget)."""
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls.after(value)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def reserve(self, share: float) -> "Deadline":
+        """Return an earlier deadline that leaves 'share' of the original budget unused."""
+        return Deadline(self.expires_at - self.budget * share, self.budget * (1 - share))
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s, budget={self.budget:.3f}s)"
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("payment_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the stage currently running, visible to processors and HTTP clients."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
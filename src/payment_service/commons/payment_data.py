@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 from enum import Enum
 
@@ -9,4 +10,8 @@ class PaymentData(BaseModel):
     amount: int
     source: str
     currency: str = "USD"
-    type: PaymentType = PaymentType.ONLINE
\ No newline at end of file
+    type: PaymentType = PaymentType.ONLINE
+    idempotency_key: Optional[str] = None
+    # Caller's id for this purchase (order, cart, attempt). Retries of the same order share it,
+    # so they are deduplicated; without it or an idempotency_key every call is a new charge.
+    order_id: Optional[str] = None
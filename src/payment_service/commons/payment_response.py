@@ -5,4 +5,15 @@ class PaymentResponse(BaseModel):
     status: str
     amount: float
     transaction_id: Optional[str] = None
-    message: Optional[str] = None
\ No newline at end of file
+    message: Optional[str] = None
+    # True when the failure is transient (network, 5xx, rate limit) and the call may be retried.
+    retryable: bool = False
+    # True only when the provider certainly never acted on the request (open breaker, 429, no
+    # connection made), so the payment may be sent to another provider without charging twice.
+    not_processed: bool = False
+    # Local reference for charges accepted while the provider is unavailable (status "pending").
+    reference_id: Optional[str] = None
+    # Processor that handled the call: the route name behind a router, else the processor class.
+    processor: Optional[str] = None
+    # ISO currency of 'amount' when the provider reports it (refunds carry no PaymentData).
+    currency: Optional[str] = None
@@ -1,20 +1,41 @@
+import threading
+from typing import Optional
 from .commons import PaymentData
-from .processors import PaymentProcessorProtocol, OfflinePaymentProcessor, StripePaymentProcessor
+from .processors import PaymentProcessorProtocol, OfflinePaymentProcessor, StripePaymentProcessor, ProcessorRegistry, ProcessorRouter
 from .commons import PaymentType
 
 class PaymentProcessorFactory:
-    ...
+    # Shared across calls: processors are built once and reused for every payment.
+    _registry: Optional[ProcessorRegistry] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_registry(cls) -> ProcessorRegistry:
+        if cls._registry is None:
+            with cls._lock:
+                if cls._registry is None:
+                    cls._registry = cls._default_registry()
+        return cls._registry
+
+    @classmethod
+    def set_registry(cls, registry: ProcessorRegistry):
+        cls._registry = registry
+
+    @classmethod
+    def use_router(cls, router: ProcessorRouter):
+        """Send the (type, currency) pairs the router covers through it."""
+        registry = cls.get_registry()
+        for payment_type, currency in router.pairs():
+            registry.register(router, [payment_type], [currency])
+
+    @classmethod
+    def create_payment_processor(cls, payment_data: PaymentData) -> PaymentProcessorProtocol:
+        """Return the shared processor for the payment; raises UnsupportedPaymentMethodError."""
+        return cls.get_registry().get(payment_data)
 
     @staticmethod
-    def create_payment_processor(payment_data: PaymentData) -> PaymentProcessorProtocol:
-        match payment_data.type:
-            case PaymentType.OFFLINE:
-                return OfflinePaymentProcessor()
-            case PaymentType.ONLINE:
-                match payment_data.currency:
-                    case "USD":
-                        return StripePaymentProcessor()
-                    case _:
-                        return "Unsupported currency for online payments"
-            case _:
-                raise ValueError("Unsupported payment type")
\ No newline at end of file
+    def _default_registry() -> ProcessorRegistry:
+        registry = ProcessorRegistry()
+        registry.register(OfflinePaymentProcessor(), [PaymentType.OFFLINE])
+        registry.register(StripePaymentProcessor(), [PaymentType.ONLINE], ["USD"])
+        return registry
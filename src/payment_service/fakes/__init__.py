@@ -0,0 +1,14 @@
+from .stripe_server import DECLINE_TOKENS, FakeStripeConfig, FakeStripeServer, LatencyProfile
+from .sms_gateway import LocalSMSGateway
+from .smtp_sink import SinkMessage, SMTPSink, SMTPSinkConfig
+
+__all__ = [
+    "DECLINE_TOKENS",
+    "FakeStripeConfig",
+    "FakeStripeServer",
+    "LatencyProfile",
+    "LocalSMSGateway",
+    "SinkMessage",
+    "SMTPSink",
+    "SMTPSinkConfig",
+]
@@ -0,0 +1,60 @@
+"""In-process stand-in for a bulk SMS provider, for exercising SMSGatewayClient and SMSNotifier."""
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Optional, Sequence
+from payment_service.notifiers.sms_gateway import SMSDeliveryReport, SMSMessage
+from .stripe_server import LatencyProfile
+
+_E164 = re.compile(r"^\+[1-9]\d{7,14}$")
+
+
+class LocalSMSGateway:
+    """Accepts batches of up to 'bulk_size' messages and records them instead of sending.
+
+    Numbers that are not E.164 fail with 'invalid_number'; 'failure_rate' fails that share
+    of whole batches as if the provider returned a 5xx. Each batch takes a 'latency' sample.
+    """
+
+    def __init__(
+        self,
+        name: str = "local",
+        bulk_size: int = 100,
+        rate_per_second: float = 100.0,
+        latency: Optional[LatencyProfile] = None,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.name = name
+        self.bulk_size = bulk_size
+        self.rate_per_second = rate_per_second
+        self.latency = latency or LatencyProfile()
+        self.failure_rate = failure_rate
+        self.messages: list[SMSMessage] = []
+        self.batches: list[tuple[float, int]] = []  # (submitted at, size)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def submit_batch(self, messages: Sequence[SMSMessage]) -> list[SMSDeliveryReport]:
+        if len(messages) > self.bulk_size:
+            raise ValueError(f"Batch of {len(messages)} exceeds bulk size {self.bulk_size}")
+        with self._lock:
+            delay, roll = self.latency.sample(self._rng), self._rng.random()
+            self.batches.append((time.monotonic(), len(messages)))
+        if delay:
+            time.sleep(delay)
+        if roll < self.failure_rate:
+            raise ConnectionError(f"{self.name}: 503 Service Unavailable")
+        reports = []
+        for message in messages:
+            if not _E164.match(message.to):
+                reports.append(SMSDeliveryReport(message.message_id, message.to, self.name, "failed", error="invalid_number"))
+                continue
+            with self._lock:
+                self.messages.append(message)
+            reports.append(SMSDeliveryReport(
+                message.message_id, message.to, self.name, "sent", gateway_message_id=f"SM{uuid.uuid4().hex[:24]}"
+            ))
+        return reports
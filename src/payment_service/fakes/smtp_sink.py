@@ -0,0 +1,185 @@
+"""Local SMTP sink for exercising EmailNotifier without a mail server.
+
+Accepts EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP and QUIT, and keeps every message in memory.
+'drop_after' closes a session after that many messages to exercise reconnects, and
+'reject_domains' answers RCPT with 550 for addresses in those domains.
+
+    python -m payment_service.fakes.smtp_sink --port 2525
+"""
+import argparse
+import socketserver
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class SinkMessage:
+    sender: str
+    recipients: list[str]
+    data: bytes
+
+
+@dataclass
+class SMTPSinkConfig:
+    host: str = "127.0.0.1"
+    port: int = 2525
+    drop_after: Optional[int] = None
+    reject_domains: tuple[str, ...] = ()
+    verbose: bool = False
+
+
+@dataclass
+class _SinkState:
+    config: SMTPSinkConfig
+    messages: list[SinkMessage] = field(default_factory=list)
+    sessions: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state: _SinkState = self.server.state
+        with state.lock:
+            state.sessions += 1
+        self._reply("220 localhost payment_service SMTP sink")
+        sender, recipients, delivered = None, [], 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode("ascii", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                self._reply("250-localhost", "250-8BITMIME", "250 SIZE 10485760")
+            elif command == "HELO":
+                self._reply("250 localhost")
+            elif command == "MAIL":
+                sender, recipients = _address(argument), []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                recipient = _address(argument)
+                if recipient.rpartition("@")[2].lower() in state.config.reject_domains:
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(recipient)
+                    self._reply("250 OK")
+            elif command == "DATA":
+                if sender is None or not recipients:
+                    self._reply("503 Bad sequence of commands")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                message = SinkMessage(sender, recipients, self._read_data())
+                with state.lock:
+                    state.messages.append(message)
+                if state.config.verbose:
+                    print(f"Message from {sender} to {', '.join(recipients)} ({len(message.data)} bytes)")
+                sender, recipients, delivered = None, [], delivered + 1
+                self._reply("250 OK queued")
+                if state.config.drop_after and delivered >= state.config.drop_after:
+                    return
+            elif command == "RSET":
+                sender, recipients = None, []
+                self._reply("250 OK")
+            elif command == "NOOP":
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Undo dot-stuffing (RFC 5321 4.5.2).
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def _reply(self, *lines: str):
+        try:
+            self.wfile.write("".join(line + "\r\n" for line in lines).encode("ascii"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _address(argument: str) -> str:
+    # "FROM:<a@b.c> SIZE=123" -> "a@b.c"
+    _, _, value = argument.partition(":")
+    return value.strip().split(" ")[0].strip("<>")
+
+
+class _SMTPSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, config: SMTPSinkConfig):
+        super().__init__((config.host, config.port), _SMTPSinkHandler)
+        self.state = _SinkState(config)
+
+
+class SMTPSink:
+    """Runs the sink on a background thread; use port=0 to pick a free port."""
+
+    def __init__(self, config: Optional[SMTPSinkConfig] = None):
+        self.config = config or SMTPSinkConfig()
+        self._server: Optional[_SMTPSinkServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            raise RuntimeError("SMTP sink is not running")
+        host, port = self._server.server_address[:2]
+        return host, port
+
+    @property
+    def messages(self) -> list[SinkMessage]:
+        return self._server.state.messages if self._server else []
+
+    @property
+    def sessions(self) -> int:
+        return self._server.state.sessions if self._server else 0
+
+    def start(self) -> "SMTPSink":
+        self._server = _SMTPSinkServer(self.config)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self) -> "SMTPSink":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--drop-after", type=int, default=None, help="close each session after this many messages")
+    args = parser.parse_args()
+
+    server = _SMTPSinkServer(SMTPSinkConfig(host=args.host, port=args.port, drop_after=args.drop_after, verbose=True))
+    print(f"SMTP sink listening on {args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""Local stand-in for the Stripe endpoints used by StripePaymentProcessor.
+
+Serves POST /v1/charges, /v1/refunds and /v1/customers with configurable latency, 5xx error
+rate, 429 rate limiting and the decline test tokens. Point a processor at it with
+StripeClientConfig(api_base=server.url) or the STRIPE_API_BASE environment variable.
+
+    python -m payment_service.fakes.stripe_server --port 12111 --latency lognormal --mean 0.08
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+from urllib.parse import parse_qs
+
+# Test tokens that Stripe declines, mapped to (code, decline_code, message).
+DECLINE_TOKENS = {
+    "tok_chargeDeclined": ("card_declined", "generic_decline", "Your card was declined."),
+    "tok_chargeDeclinedInsufficientFunds": ("card_declined", "insufficient_funds", "Your card has insufficient funds."),
+    "tok_chargeDeclinedFraudulent": ("card_declined", "fraudulent", "Your card was declined."),
+    "tok_chargeDeclinedExpiredCard": ("expired_card", None, "Your card has expired."),
+    "tok_chargeDeclinedIncorrectCvc": ("incorrect_cvc", None, "Your card's security code is incorrect."),
+    "tok_chargeDeclinedProcessingError": ("processing_error", None, "An error occurred while processing your card."),
+    "tok_radarBlock": ("card_declined", "fraudulent", "Your card was declined."),
+}
+
+
+@dataclass
+class LatencyProfile:
+    """Per-request latency in seconds: 'fixed' (mean), 'uniform' (low..high) or 'lognormal' (mean, sigma)."""
+    distribution: str = "fixed"
+    mean: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "fixed":
+            return self.mean
+        if self.distribution == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.distribution == "lognormal":
+            if self.mean <= 0:
+                return 0.0
+            # Parameterised so that the median of the distribution equals 'mean'.
+            return rng.lognormvariate(0.0, self.sigma) * self.mean
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+@dataclass
+class FakeStripeConfig:
+    host: str = "127.0.0.1"
+    port: int = 12111
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: Optional[int] = None
+    idempotency_cache_size: int = 100_000
+
+
+class _FakeStripeState:
+    """Charges, refunds and idempotent replays shared by all handler threads."""
+
+    def __init__(self, config: FakeStripeConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.charges: dict[str, dict] = {}
+        self.refunds: dict[str, dict] = {}
+        self.customers: dict[str, dict] = {}
+        self.replays: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self.lock = threading.Lock()
+        # Per idempotency key: [lock, number of requests using it]; removed when unused.
+        self._key_locks: dict[str, list] = {}
+
+    def draw(self) -> tuple[float, float]:
+        with self.lock:
+            return self.config.latency.sample(self.rng), self.rng.random()
+
+    @contextmanager
+    def idempotent(self, key: Optional[str]) -> Iterator[None]:
+        """Serialise requests sharing an idempotency key across replay lookup, create and remember."""
+        if not key:
+            yield
+            return
+        with self.lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def replay(self, key: Optional[str]) -> Optional[tuple[int, dict]]:
+        if not key:
+            return None
+        with self.lock:
+            return self.replays.get(key)
+
+    def remember(self, key: Optional[str], status: int, body: dict):
+        # Stripe only stores idempotent results for requests that reached the API (not 429/5xx).
+        if not key or status == 429 or status >= 500:
+            return
+        with self.lock:
+            self.replays[key] = (status, body)
+            while len(self.replays) > self.config.idempotency_cache_size:
+                self.replays.popitem(last=False)
+
+    def create_charge(self, params: dict) -> tuple[int, dict]:
+        try:
+            amount = int(params.get("amount", ""))
+        except ValueError:
+            return 400, _error("invalid_request_error", "parameter_invalid_integer", "Invalid integer: amount", param="amount")
+        source = params.get("source")
+        customer_id = params.get("customer")
+        if customer_id:
+            with self.lock:
+                customer = self.customers.get(customer_id)
+            if customer is None:
+                return 404, _error("invalid_request_error", "resource_missing", f"No such customer: '{customer_id}'", param="customer")
+            source = source or customer["default_source"]
+        if not source:
+            return 400, _error("invalid_request_error", "missing", "Must provide source or customer.", param="source")
+        charge_id = _object_id("ch")
+        if source in DECLINE_TOKENS:
+            return 402, _card_error(source, charge=charge_id)
+        charge = {
+            "id": charge_id,
+            "object": "charge",
+            "amount": amount,
+            "amount_refunded": 0,
+            "currency": params.get("currency", "usd").lower(),
+            "customer": customer_id,
+            "description": params.get("description"),
+            "paid": True,
+            "refunded": False,
+            "status": "succeeded",
+            "created": int(time.time()),
+            "livemode": False,
+        }
+        with self.lock:
+            self.charges[charge_id] = charge
+        return 200, charge
+
+    def create_customer(self, params: dict) -> tuple[int, dict]:
+        source = params.get("source")
+        if source in DECLINE_TOKENS:
+            return 402, _card_error(source, param="source")
+        customer = {
+            "id": _object_id("cus"),
+            "object": "customer",
+            "name": params.get("name"),
+            "email": params.get("email"),
+            "phone": params.get("phone"),
+            "default_source": source,
+            "created": int(time.time()),
+        }
+        with self.lock:
+            self.customers[customer["id"]] = customer
+        return 200, customer
+
+    def create_refund(self, params: dict) -> tuple[int, dict]:
+        charge_id = params.get("charge")
+        with self.lock:
+            charge = self.charges.get(charge_id)
+            if charge is None:
+                return 404, _error("invalid_request_error", "resource_missing", f"No such charge: '{charge_id}'", param="charge")
+            if charge["refunded"]:
+                return 400, _error("invalid_request_error", "charge_already_refunded", f"Charge {charge_id} has already been refunded.")
+            charge["refunded"] = True
+            charge["amount_refunded"] = charge["amount"]
+            refund = {
+                "id": _object_id("re"),
+                "object": "refund",
+                "amount": charge["amount"],
+                "charge": charge_id,
+                "currency": charge["currency"],
+                "status": "succeeded",
+                "created": int(time.time()),
+            }
+            self.refunds[refund["id"]] = refund
+        return 200, refund
+
+
+def _object_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def _error(error_type: str, code: Optional[str], message: str, **extra) -> dict:
+    error = {"type": error_type, "message": message}
+    if code:
+        error["code"] = code
+    error.update(extra)
+    return {"error": error}
+
+
+def _card_error(token: str, **extra) -> dict:
+    code, decline_code, message = DECLINE_TOKENS[token]
+    if decline_code:
+        extra["decline_code"] = decline_code
+    return _error("card_error", code, message, **extra)
+
+
+class _FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_FakeStripeHTTPServer"
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get("Content-Length") or 0)
+        params = {key: values[-1] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        latency, roll = state.draw()
+        if latency > 0:
+            time.sleep(latency)
+
+        idempotency_key = self.headers.get("Idempotency-Key")
+        # Concurrent requests with one key must not both miss the replay and create twice.
+        with state.idempotent(idempotency_key):
+            replay = state.replay(idempotency_key)
+            if replay is None:
+                status, body = self._handle(state, params, roll)
+                state.remember(idempotency_key, status, body)
+        if replay is not None:
+            self._send(*replay, replayed=True)
+        else:
+            self._send(status, body)
+
+    def _handle(self, state: _FakeStripeState, params: dict, roll: float) -> tuple[int, dict]:
+        config = state.config
+        if roll < config.rate_limit_rate:
+            return 429, _error("invalid_request_error", "rate_limit", "Too many requests hit the API too quickly.")
+        if roll < config.rate_limit_rate + config.error_rate:
+            return 500, _error("api_error", None, "An unknown error occurred.")
+        if self.path == "/v1/charges":
+            return state.create_charge(params)
+        if self.path == "/v1/refunds":
+            return state.create_refund(params)
+        if self.path == "/v1/customers":
+            return state.create_customer(params)
+        return 404, _error("invalid_request_error", None, f"Unrecognized request URL (POST: {self.path}).")
+
+    def _send(self, status: int, body: dict, replayed: bool = False):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Request-Id", _object_id("req"))
+        if replayed:
+            self.send_header("Idempotent-Replayed", "true")
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its deadline expired) before the response was ready.
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeStripeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, config: FakeStripeConfig):
+        super().__init__((config.host, config.port), _FakeStripeHandler)
+        self.state = _FakeStripeState(config)
+
+
+class FakeStripeServer:
+    """Runs the fake API on a background thread; use port=0 to pick a free port."""
+
+    def __init__(self, config: Optional[FakeStripeConfig] = None):
+        self.config = config or FakeStripeConfig()
+        self._server: Optional[_FakeStripeHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Fake Stripe server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def charges(self) -> dict[str, dict]:
+        return self._server.state.charges if self._server else {}
+
+    @property
+    def refunds(self) -> dict[str, dict]:
+        return self._server.state.refunds if self._server else {}
+
+    @property
+    def customers(self) -> dict[str, dict]:
+        return self._server.state.customers if self._server else {}
+
+    def start(self) -> "FakeStripeServer":
+        self._server = _FakeStripeHTTPServer(self.config)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-stripe", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self) -> "FakeStripeServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Stripe API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--mean", type=float, default=0.0, help="fixed latency or lognormal median, in seconds")
+    parser.add_argument("--low", type=float, default=0.0)
+    parser.add_argument("--high", type=float, default=0.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeStripeConfig(
+        host=args.host,
+        port=args.port,
+        latency=LatencyProfile(args.latency, args.mean, args.low, args.high, args.sigma),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    server = _FakeStripeHTTPServer(config)
+    print(f"Fake Stripe listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from .cache import IdempotencyCache
+from .keys import batch_item_idempotency_key, charge_idempotency_key, recurring_setup_idempotency_key, refund_idempotency_key, unique_charge_key
+
+__all__ = [
+    "IdempotencyCache",
+    "batch_item_idempotency_key",
+    "charge_idempotency_key",
+    "recurring_setup_idempotency_key",
+    "refund_idempotency_key",
+    "unique_charge_key",
+]
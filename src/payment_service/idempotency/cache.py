@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from payment_service.commons import PaymentResponse
+
+
+class IdempotencyCache:
+    """Bounded, thread-safe TTL + LRU cache of completed responses keyed by idempotency key.
+
+    reserve/try_reserve make check-then-charge atomic: the first caller for a key owns it
+    until it calls put (or release, when there is nothing to cache), and concurrent callers
+    with the same key wait for that outcome instead of charging and notifying a second time.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 24 * 60 * 60):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, PaymentResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._in_flight: set[str] = set()
+
+    def get(self, key: str) -> Optional[PaymentResponse]:
+        with self._lock:
+            return self._get(key)
+
+    def try_reserve(self, key: str) -> tuple[bool, Optional[PaymentResponse]]:
+        """Claim 'key' without waiting.
+
+        Returns (True, None) when the caller now owns it, (False, response) when it already
+        completed, and (False, None) while another caller holds it (reserve waits for that).
+        """
+        with self._lock:
+            response = self._get(key)
+            if response is not None:
+                return False, response
+            if key in self._in_flight:
+                return False, None
+            self._in_flight.add(key)
+            return True, None
+
+    def reserve(self, key: str, timeout: Optional[float] = None) -> Optional[PaymentResponse]:
+        """Return the completed response for 'key', or None once the caller owns the key.
+
+        Waits while another caller holds it; raises TimeoutError after 'timeout' seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                response = self._get(key)
+                if response is not None:
+                    return response
+                if key not in self._in_flight:
+                    self._in_flight.add(key)
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"A request with idempotency key {key} is still in progress")
+                self._released.wait(remaining)
+
+    def release(self, key: str):
+        """Give up ownership without caching anything, e.g. after a failure, so a retry may run."""
+        with self._lock:
+            self._in_flight.discard(key)
+            self._released.notify_all()
+
+    def put(self, key: str, response: PaymentResponse):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._in_flight.discard(key)
+            self._released.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str) -> Optional[PaymentResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
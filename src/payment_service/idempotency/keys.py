@@ -0,0 +1,48 @@
+import hashlib
+import uuid
+from payment_service.commons import CustomerData, PaymentData
+
+
+def charge_idempotency_key(customer_data: CustomerData, payment_data: PaymentData) -> str:
+    """Return the caller-supplied key, or one derived from the charge's identifying fields.
+
+    The same order_id, customer, amount, currency, source and payment type always map to the
+    same key, so a retried request is recognised both locally and by Stripe. Without an
+    order_id two identical purchases would share a key; PaymentService therefore pins a fresh
+    key on charges that carry neither (see unique_charge_key).
+    """
+    if payment_data.idempotency_key:
+        return payment_data.idempotency_key
+    fields = (
+        payment_data.order_id or "",
+        customer_data.customer_id or "",
+        customer_data.name,
+        customer_data.contact_info.email or "",
+        customer_data.contact_info.phone or "",
+        str(payment_data.amount),
+        payment_data.currency.upper(),
+        payment_data.source,
+        payment_data.type.value,
+    )
+    digest = hashlib.sha256("\x1f".join(fields).encode()).hexdigest()
+    return f"charge_{digest[:32]}"
+
+
+def unique_charge_key() -> str:
+    """A key for a charge the caller gave no identity to: it only deduplicates that call's own retries."""
+    return f"charge_{uuid.uuid4().hex}"
+
+
+def batch_item_idempotency_key(run_id: str, index: int) -> str:
+    """Key for row 'index' of a checkpointed batch run; the same on every resume of that run."""
+    digest = hashlib.sha256(f"{run_id}\x1f{index}".encode()).hexdigest()
+    return f"batch_{digest[:32]}"
+
+
+def refund_idempotency_key(transaction_id: str) -> str:
+    """A charge can only be fully refunded once, so its id is enough to identify the refund."""
+    return f"refund_{transaction_id}"
+
+
+def recurring_setup_idempotency_key(customer_data: CustomerData, payment_data: PaymentData) -> str:
+    return "setup_" + charge_idempotency_key(customer_data, payment_data)
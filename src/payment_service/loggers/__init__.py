@@ -1,3 +1,32 @@
-from .transaction import TransactionLogger
+from .records import (
+    TransactionRecord,
+    convert_legacy_log,
+    decode_binary,
+    decode_jsonl,
+    encode_binary,
+    encode_jsonl,
+    iter_records,
+    iter_stream,
+)
+from .transaction import TransactionLogger, format_refund, format_transaction
+from .buffered import BufferedTransactionLogger, FlushHandle
+from .segments import SegmentInfo, SegmentedLogStore, SegmentedTransactionLogger
 
-__all__ = ["TransactionLogger"]
\ No newline at end of file
+__all__ = [
+    "TransactionLogger",
+    "BufferedTransactionLogger",
+    "FlushHandle",
+    "SegmentInfo",
+    "SegmentedLogStore",
+    "SegmentedTransactionLogger",
+    "TransactionRecord",
+    "convert_legacy_log",
+    "decode_binary",
+    "decode_jsonl",
+    "encode_binary",
+    "encode_jsonl",
+    "format_refund",
+    "format_transaction",
+    "iter_records",
+    "iter_stream",
+]
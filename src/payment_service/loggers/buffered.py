@@ -0,0 +1,146 @@
+import atexit
+import os
+import threading
+import time
+from typing import Optional
+from .records import BINARY_MAGIC
+from .transaction import TransactionLogger
+
+
+class FlushHandle:
+    """Completes when the flush that includes a record has been written (and fsynced, if enabled)."""
+    __slots__ = ("_done", "_error")
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the record is flushed; False on timeout. Re-raises the write error if the flush failed."""
+        if not self._done.wait(timeout):
+            return False
+        if self._error is not None:
+            raise self._error
+        return True
+
+    def _resolve(self, error: Optional[BaseException] = None):
+        self._error = error
+        self._done.set()
+
+
+class BufferedTransactionLogger(TransactionLogger):
+    """TransactionLogger that appends to an in-memory buffer and writes it from a background thread.
+
+    The log file stays open. A flush happens once 'flush_bytes' are buffered or every
+    'flush_interval' seconds, with one write (and, with 'fsync', one fsync) for everything
+    logged since the last flush. log_transaction and log_refund return a FlushHandle that
+    callers needing durability can wait on. close(), also run at interpreter exit, flushes
+    what is left.
+    """
+
+    def __init__(
+        self,
+        path: str = "transactions.log",
+        log_format: str = "text",
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 0.2,
+        fsync: bool = False,
+    ):
+        super().__init__(path, log_format)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._open_output()
+        self._buffer: list[bytes] = []
+        self._buffered_bytes = 0
+        # Time range of the buffered records, handed to the output with each flush.
+        self._first_timestamp = self._last_timestamp = 0.0
+        self._handle = FlushHandle()
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name="log-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def flush(self, wait: bool = True) -> FlushHandle:
+        """Flush the buffer now instead of at the next size or interval trigger."""
+        with self._cond:
+            handle = self._handle
+            self._flush_requested = True
+            self._cond.notify()
+        if wait:
+            handle.wait()
+        return handle
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join()
+        self._close_output()
+        atexit.unregister(self.close)
+
+    def _open_output(self):
+        self._file = open(self.path, "ab")
+        if self.log_format == "binary" and self._file.tell() == 0:
+            self._file.write(BINARY_MAGIC)
+
+    def _write_output(self, data: bytes, count: int, first_timestamp: float, last_timestamp: float):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _close_output(self):
+        self._file.close()
+
+    def _append(self, record: bytes, timestamp: float) -> FlushHandle:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BufferedTransactionLogger is closed")
+            if not self._buffer:
+                self._first_timestamp = self._last_timestamp = timestamp
+            else:
+                self._first_timestamp = min(self._first_timestamp, timestamp)
+                self._last_timestamp = max(self._last_timestamp, timestamp)
+            self._buffer.append(record)
+            self._buffered_bytes += len(record)
+            if self._buffered_bytes >= self.flush_bytes:
+                self._flush_requested = True
+                self._cond.notify()
+            return self._handle
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._flush_requested or self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                records, handle, closing = self._buffer, self._handle, self._closed
+                first_timestamp, last_timestamp = self._first_timestamp, self._last_timestamp
+                self._buffer, self._buffered_bytes, self._handle = [], 0, FlushHandle()
+                self._first_timestamp = self._last_timestamp = 0.0
+                self._flush_requested = False
+            handle._resolve(self._write(records, first_timestamp, last_timestamp))
+            if closing:
+                return
+
+    def _write(self, records: list[bytes], first_timestamp: float, last_timestamp: float) -> Optional[BaseException]:
+        if not records:
+            return None
+        try:
+            self._write_output(b"".join(records), len(records), first_timestamp, last_timestamp)
+        except OSError as e:
+            print("Transaction log flush failed:", e)
+            return e
+        return None
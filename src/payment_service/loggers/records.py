@@ -0,0 +1,201 @@
+import json
+import math
+import os
+import struct
+from dataclasses import dataclass, fields
+from typing import BinaryIO, Iterator, Optional
+
+LOG_FORMATS = ("text", "jsonl", "binary")
+
+# First bytes of a binary log; lets readers tell the formats apart.
+BINARY_MAGIC = b"TXLOG\x00\x01\n"
+
+# Frame: uint32 payload length, then the fixed part and six strings.
+_LENGTH = struct.Struct("<I")
+# timestamp (s since epoch), amount (minor units), latency_ms (NaN when unknown), kind (0 charge, 1 refund)
+_FIXED = struct.Struct("<dqdB")
+_STRING_LENGTH = struct.Struct("<H")
+_NONE = 0xFFFF
+_KINDS = ("charge", "refund")
+_READ_SIZE = 1 << 20
+
+
+@dataclass(slots=True)
+class TransactionRecord:
+    """One transaction log entry with a fixed schema."""
+    timestamp: float
+    kind: str  # "charge" or "refund"
+    transaction_id: Optional[str]
+    customer: str
+    amount: int
+    currency: str
+    status: str
+    processor: Optional[str] = None
+    latency_ms: Optional[float] = None
+    message: Optional[str] = None
+
+
+_FIELDS = tuple(field.name for field in fields(TransactionRecord))
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_jsonl(record: TransactionRecord) -> bytes:
+    # dataclasses.asdict deep-copies every value; the schema is flat, so plain getattr is enough.
+    return _JSON_ENCODER.encode({name: getattr(record, name) for name in _FIELDS}).encode("utf-8") + b"\n"
+
+
+def decode_jsonl(line: bytes | str) -> TransactionRecord:
+    return TransactionRecord(**json.loads(line))
+
+
+def encode_binary(record: TransactionRecord) -> bytes:
+    latency = math.nan if record.latency_ms is None else record.latency_ms
+    parts = [_FIXED.pack(record.timestamp, record.amount, latency, _KINDS.index(record.kind))]
+    for value in (record.transaction_id, record.customer, record.currency, record.status, record.processor, record.message):
+        if value is None:
+            parts.append(_STRING_LENGTH.pack(_NONE))
+            continue
+        data = value.encode("utf-8")[:_NONE - 1]
+        parts.append(_STRING_LENGTH.pack(len(data)))
+        parts.append(data)
+    payload = b"".join(parts)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_binary(buffer: bytes | memoryview, offset: int = 0) -> TransactionRecord:
+    """Decode the payload (without its length prefix) that starts at 'offset'."""
+    timestamp, amount, latency, kind = _FIXED.unpack_from(buffer, offset)
+    offset += _FIXED.size
+    strings = []
+    for _ in range(6):
+        (length,) = _STRING_LENGTH.unpack_from(buffer, offset)
+        offset += _STRING_LENGTH.size
+        if length == _NONE:
+            strings.append(None)
+            continue
+        strings.append(str(buffer[offset:offset + length], "utf-8"))
+        offset += length
+    transaction_id, customer, currency, status, processor, message = strings
+    return TransactionRecord(
+        timestamp,
+        _KINDS[kind],
+        transaction_id,
+        customer,
+        amount,
+        currency,
+        status,
+        processor,
+        None if math.isnan(latency) else latency,
+        message,
+    )
+
+
+def encode_record(record: TransactionRecord, log_format: str) -> bytes:
+    if log_format == "jsonl":
+        return encode_jsonl(record)
+    if log_format == "binary":
+        return encode_binary(record)
+    raise ValueError(f"Unsupported structured log format: {log_format}")
+
+
+def detect_format(stream: BinaryIO) -> str:
+    head = stream.read(len(BINARY_MAGIC))
+    stream.seek(-len(head), os.SEEK_CUR)
+    if head == BINARY_MAGIC:
+        return "binary"
+    return "jsonl" if head[:1] == b"{" or not head else "text"
+
+
+def iter_records(path: str) -> Iterator[TransactionRecord]:
+    """Stream the records of a JSONL or binary log; the format is detected from the file."""
+    with open(path, "rb") as stream:
+        yield from iter_stream(stream, path)
+
+
+def iter_stream(stream: BinaryIO, name: str = "log") -> Iterator[TransactionRecord]:
+    """Stream records from an open binary file object, e.g. a gzip.GzipFile."""
+    log_format = detect_format(stream)
+    if log_format == "binary":
+        stream.read(len(BINARY_MAGIC))
+        yield from _iter_binary(stream)
+    elif log_format == "jsonl":
+        for line in stream:
+            if line.strip():
+                yield decode_jsonl(line)
+    else:
+        raise ValueError(f"{name} is a legacy text log; convert it with convert_legacy_log first")
+
+
+def _iter_binary(stream: BinaryIO) -> Iterator[TransactionRecord]:
+    # Reads into one reusable 1 MiB buffer and decodes frames in place.
+    buffer = bytearray(_READ_SIZE)
+    view = memoryview(buffer)
+    start = end = 0
+    while True:
+        available = end - start
+        frame = _LENGTH.size
+        if available >= _LENGTH.size:
+            frame += _LENGTH.unpack_from(buffer, start)[0]
+            if available >= frame:
+                yield decode_binary(view, start + _LENGTH.size)
+                start += frame
+                continue
+        # No whole frame left: move the partial one to the front and refill behind it.
+        if frame > len(buffer):
+            view.release()
+            buffer.extend(bytes(frame - len(buffer)))
+            view = memoryview(buffer)
+        buffer[:available] = buffer[start:end]
+        read = stream.readinto(view[available:])
+        if not read:
+            if available:
+                raise ValueError("Truncated record at end of binary log")
+            return
+        start, end = 0, available + read
+
+
+def convert_legacy_log(
+    source: str,
+    destination: str,
+    log_format: str = "jsonl",
+    currency: str = "USD",
+    timestamp: Optional[float] = None,
+) -> int:
+    """Rewrite a legacy text transactions.log as structured records and return how many were written.
+
+    The text format has no timestamps or currencies: every record gets 'timestamp'
+    (default: the source file's modification time) and 'currency'.
+    """
+    if timestamp is None:
+        timestamp = os.path.getmtime(source)
+    count = 0
+    with open(destination, "wb") as output:
+        if log_format == "binary":
+            output.write(BINARY_MAGIC)
+        for record in _parse_legacy(source, timestamp, currency):
+            output.write(encode_record(record, log_format))
+            count += 1
+    return count
+
+
+def _parse_legacy(source: str, timestamp: float, currency: str) -> Iterator[TransactionRecord]:
+    record: Optional[TransactionRecord] = None
+    with open(source, encoding="utf-8") as lines:
+        for line in lines:
+            line = line.rstrip("\n")
+            if line.startswith("Refund processed for transaction "):
+                record = TransactionRecord(timestamp, "refund", line.rpartition(" ")[2], "", 0, currency, "")
+            elif line.startswith("Payment status: ") and record is not None:
+                record.status = line[len("Payment status: "):]
+            elif line.startswith("Refund status: ") and record is not None:
+                record.status = line[len("Refund status: "):]
+            elif line.startswith("Transaction ID: ") and record is not None:
+                record.transaction_id = line[len("Transaction ID: "):]
+            elif line.startswith("Message: ") and record is not None:
+                # Every legacy record ends with its message line.
+                record.message = line[len("Message: "):]
+                yield record
+                record = None
+            elif " paid " in line:
+                customer, _, amount = line.rpartition(" paid ")
+                record = TransactionRecord(timestamp, "charge", None, customer, int(float(amount)), currency, "")
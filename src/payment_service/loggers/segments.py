@@ -0,0 +1,310 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from .buffered import BufferedTransactionLogger
+from .records import BINARY_MAGIC, LOG_FORMATS, TransactionRecord, iter_stream
+
+_EXTENSIONS = {"jsonl": "jsonl", "binary": "bin"}
+# Size of the uint32 length prefix in front of every binary record.
+_FRAME_LENGTH = 4
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class SegmentInfo:
+    name: str
+    sequence: int
+    first_timestamp: float
+    last_timestamp: float
+    records: int
+    size: int
+    compressed: bool = False
+
+    def overlaps(self, start: Optional[float], end: Optional[float]) -> bool:
+        return (start is None or self.last_timestamp >= start) and (end is None or self.first_timestamp <= end)
+
+
+class SegmentedLogStore:
+    """Transaction log kept as a directory of bounded segment files plus a JSON manifest.
+
+    Records are stored as JSONL or binary ('text' records carry no timestamps to index by). The
+    active segment is sealed once it reaches 'max_segment_bytes' or is 'max_segment_age'
+    seconds old, also when no further writes arrive. Sealed segments are gzipped on a background thread, and
+    with 'retain_segments' only that many sealed segments are kept. The manifest records each
+    sealed segment's time range and record count, so range queries open only the segments
+    that overlap. A segment left unsealed by a crash is scanned and sealed on the next open.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        log_format: str = "jsonl",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segment_age: float = 3600.0,
+        compress: bool = True,
+        retain_segments: Optional[int] = None,
+    ):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        if log_format == "text":
+            raise ValueError("Segmented logs need a structured format ('jsonl' or 'binary'); text records have no timestamps")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_format = log_format
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.compress = compress
+        self.retain_segments = retain_segments
+        self._lock = threading.Lock()
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+        self._sealed: list[SegmentInfo] = self._load_manifest()
+        self._recover()
+        self._file: Optional[BinaryIO] = None
+        self._active: Optional[SegmentInfo] = None
+        self._opened_at = 0.0
+        # Serialises writes with rotation by the sealer thread.
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sealer = threading.Thread(target=self._seal_idle, name="log-seal", daemon=True)
+        self._sealer.start()
+
+    def write(self, data: bytes, count: int, first_timestamp: float, last_timestamp: float, fsync: bool = False):
+        """Append already encoded records to the active segment, rotating first if it is full or old."""
+        with self._write_lock:
+            if self._active is not None and (
+                self._active.size >= self.max_segment_bytes or time.monotonic() - self._opened_at >= self.max_segment_age
+            ):
+                self._rotate_locked()
+            if self._active is None:
+                self._open_segment(first_timestamp)
+            self._file.write(data)
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+            active = self._active
+            active.size += len(data)
+            active.records += count
+            active.first_timestamp = min(active.first_timestamp, first_timestamp)
+            active.last_timestamp = max(active.last_timestamp, last_timestamp)
+
+    def rotate(self) -> Optional[Future]:
+        """Seal the active segment and queue its compression; returns the compression future, if any."""
+        with self._write_lock:
+            return self._rotate_locked()
+
+    def _rotate_locked(self) -> Optional[Future]:
+        if self._active is None:
+            return None
+        self._file.close()
+        sealed, self._active, self._file = self._active, None, None
+        with self._lock:
+            self._sealed.append(sealed)
+            self._write_manifest()
+        return self._after_seal(sealed)
+
+    def segments(self, start: Optional[float] = None, end: Optional[float] = None) -> list[SegmentInfo]:
+        """Segments whose time range overlaps [start, end], oldest first, including the active one."""
+        with self._lock:
+            candidates = list(self._sealed)
+        if self._active is not None:
+            candidates.append(self._active)
+        return [segment for segment in candidates if segment.overlaps(start, end)]
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[TransactionRecord]:
+        """Stream records with start <= timestamp <= end, opening only overlapping segments."""
+        for segment in self.segments(start, end):
+            stream = self._open_for_read(segment)
+            if stream is None:
+                continue  # dropped by retention since the listing
+            with stream:
+                records = iter_stream(stream, segment.name)
+                try:
+                    for record in records:
+                        if (start is None or record.timestamp >= start) and (end is None or record.timestamp <= end):
+                            yield record
+                except ValueError:
+                    if segment is not self._active:
+                        raise
+                    # The writer is mid-append on the active segment; stop at its last whole record.
+
+    def close(self):
+        self._stop.set()
+        self._sealer.join()
+        self.rotate()
+        self._compressor.shutdown(wait=True)
+
+    def _seal_idle(self):
+        # write() only checks the age when the next record arrives; this seals a quiet segment on time.
+        while True:
+            with self._write_lock:
+                if self._active is not None and time.monotonic() - self._opened_at >= self.max_segment_age:
+                    self._rotate_locked()
+                wait = self.max_segment_age
+                if self._active is not None:
+                    wait = self._opened_at + self.max_segment_age - time.monotonic()
+            if self._stop.wait(max(wait, 0.01)):
+                return
+
+    def _open_segment(self, first_timestamp: float):
+        sequence = max((segment.sequence for segment in self._sealed), default=0) + 1
+        name = f"segment-{sequence:08d}.{_EXTENSIONS[self.log_format]}"
+        self._file = open(self.directory / name, "ab")
+        size = 0
+        if self.log_format == "binary":
+            self._file.write(BINARY_MAGIC)
+            size = len(BINARY_MAGIC)
+        self._active = SegmentInfo(name, sequence, first_timestamp, first_timestamp, 0, size)
+        self._opened_at = time.monotonic()
+
+    def _after_seal(self, segment: SegmentInfo) -> Optional[Future]:
+        future = self._compressor.submit(self._compress, segment) if self.compress else None
+        if self.retain_segments is not None:
+            self._compressor.submit(self._enforce_retention)
+        return future
+
+    def _compress(self, segment: SegmentInfo):
+        source = self.directory / segment.name
+        target = self.directory / (segment.name + ".gz")
+        partial = self.directory / (segment.name + ".gz.tmp")
+        if not source.exists():
+            return
+        with open(source, "rb") as raw, gzip.open(partial, "wb", compresslevel=6) as compressed:
+            shutil.copyfileobj(raw, compressed, 1 << 20)
+        os.replace(partial, target)
+        with self._lock:
+            segment.name = target.name
+            segment.compressed = True
+            self._write_manifest()
+        source.unlink()
+
+    def _enforce_retention(self):
+        with self._lock:
+            expired = self._sealed[:-self.retain_segments] if self.retain_segments else list(self._sealed)
+            if not expired:
+                return
+            self._sealed = self._sealed[len(expired):]
+            self._write_manifest()
+        for segment in expired:
+            (self.directory / segment.name).unlink(missing_ok=True)
+
+    def _open_for_read(self, segment: SegmentInfo) -> Optional[BinaryIO]:
+        # Compression may swap the file for its .gz between reading the entry and opening it,
+        # so a missing file is looked up once more before the segment is treated as gone.
+        for _ in range(2):
+            with self._lock:
+                path, compressed = self.directory / segment.name, segment.compressed
+            try:
+                return gzip.open(path, "rb") if compressed else open(path, "rb")
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _load_manifest(self) -> list[SegmentInfo]:
+        path = self.directory / MANIFEST_NAME
+        if not path.exists():
+            return []
+        with path.open(encoding="utf-8") as f:
+            return [SegmentInfo(**entry) for entry in json.load(f)["segments"]]
+
+    def _write_manifest(self):
+        # Written to a temporary file and renamed, so readers never see a half-written manifest.
+        path = self.directory / MANIFEST_NAME
+        partial = path.with_suffix(".json.tmp")
+        with partial.open("w", encoding="utf-8") as f:
+            json.dump({"log_format": self.log_format, "segments": [asdict(segment) for segment in self._sealed]}, f, indent=1)
+        os.replace(partial, path)
+
+    def _recover(self):
+        known = {segment.name.removesuffix(".gz") for segment in self._sealed}
+        for segment in self._sealed:
+            raw = self.directory / segment.name.removesuffix(".gz")
+            if segment.compressed:
+                # Compressed and recorded, but the process died before removing the original.
+                raw.unlink(missing_ok=True)
+            elif (self.directory / (segment.name + ".gz")).exists() and not raw.exists():
+                # Compressed and removed, but the manifest update was lost.
+                segment.name += ".gz"
+                segment.compressed = True
+            elif self.compress:
+                self._compressor.submit(self._compress, segment)
+        for partial in self.directory.glob("segment-*.gz.tmp"):
+            partial.unlink()
+        suffix = "." + _EXTENSIONS[self.log_format]
+        for path in sorted(self.directory.glob(f"segment-*{suffix}")):
+            if path.name not in known:
+                print("Sealing transaction log segment left open:", path.name)
+                segment = self._scan(path)
+                self._sealed.append(segment)
+                self._after_seal(segment)
+        self._sealed.sort(key=lambda segment: segment.sequence)
+        with self._lock:
+            self._write_manifest()
+
+    def _scan(self, path: Path) -> SegmentInfo:
+        sequence = int(path.stem.split("-")[1])
+        self._truncate_partial_tail(path)
+        size = path.stat().st_size
+        modified = path.stat().st_mtime
+        records, first, last = 0, modified, modified
+        with path.open("rb") as f:
+            for record in iter_stream(f, path.name):
+                if not records:
+                    first = last = record.timestamp
+                records += 1
+                first, last = min(first, record.timestamp), max(last, record.timestamp)
+        return SegmentInfo(path.name, sequence, first, last, records, size)
+
+    def _truncate_partial_tail(self, path: Path):
+        # A crash mid-flush can leave half a record at the end; cut back to the last whole one.
+        with path.open("r+b") as f:
+            data = f.read()
+            if self.log_format == "binary":
+                end = len(BINARY_MAGIC) if data.startswith(BINARY_MAGIC) else 0
+                while end + _FRAME_LENGTH <= len(data):
+                    frame = _FRAME_LENGTH + int.from_bytes(data[end:end + _FRAME_LENGTH], "little")
+                    if end + frame > len(data):
+                        break
+                    end += frame
+            else:
+                end = data.rfind(b"\n") + 1
+            if end < len(data):
+                print(f"Dropping {len(data) - end} bytes of a partial record at the end of {path.name}")
+                f.truncate(end)
+
+
+class SegmentedTransactionLogger(BufferedTransactionLogger):
+    """BufferedTransactionLogger whose output is a SegmentedLogStore directory instead of one file."""
+
+    def __init__(
+        self,
+        directory: str | Path = "transaction_logs",
+        log_format: str = "jsonl",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segment_age: float = 3600.0,
+        compress: bool = True,
+        retain_segments: Optional[int] = None,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 0.2,
+        fsync: bool = False,
+    ):
+        self.store = SegmentedLogStore(directory, log_format, max_segment_bytes, max_segment_age, compress, retain_segments)
+        super().__init__(str(directory), log_format, flush_bytes, flush_interval, fsync)
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[TransactionRecord]:
+        return self.store.iter_records(start, end)
+
+    def _open_output(self):
+        pass
+
+    def _write_output(self, data: bytes, count: int, first_timestamp: float, last_timestamp: float):
+        self.store.write(data, count, first_timestamp, last_timestamp, fsync=self.fsync)
+
+    def _close_output(self):
+        self.store.close()
@@ -1,27 +1,95 @@
+import time
+from typing import Optional
 from payment_service.commons import CustomerData, PaymentData, PaymentResponse
+from .records import BINARY_MAGIC, LOG_FORMATS, TransactionRecord, encode_record
+
+
+def format_transaction(customer_data: CustomerData, payment_data: PaymentData, payment_response: PaymentResponse) -> str:
+    lines = [
+        f"{customer_data.name} paid {payment_data.amount}\n",
+        f"Payment status: {payment_response.status}\n",
+    ]
+    if payment_response.transaction_id:
+        lines.append(f"Transaction ID: {payment_response.transaction_id}\n")
+    lines.append(f"Message: {payment_response.message}\n")
+    return "".join(lines)
+
+
+def format_refund(transaction_id: str, refund_response: PaymentResponse) -> str:
+    return (
+        f"Refund processed for transaction {transaction_id}\n"
+        f"Refund status: {refund_response.status}\n"
+        f"Message: {refund_response.message}\n"
+    )
+
 
 class TransactionLogger:
-    def log_transaction(self, customer_data: CustomerData, payment_data: PaymentData, payment_response: PaymentResponse):
-        with open("transactions.log", "a") as log_file:
-            log_file.write(
-                f"{customer_data.name} paid {payment_data.amount}\n"
-            )
-            log_file.write(
-                f"Payment status: {payment_response.status}\n"
-            )
-            if payment_response.transaction_id:
-                log_file.write(
-                    f"Transaction ID: {payment_response.transaction_id}\n"
-                )
-            log_file.write(f"Message: {payment_response.message}\n")
-
-    def log_refund(self, transaction_id: str, refund_response: PaymentResponse):
-        with open("transactions.log", "a") as log_file:
-            log_file.write(
-                f"Refund processed for transaction {transaction_id}\n"
-            )
-            log_file.write(
-                f"Refund status: {refund_response.status}\n"
-            )
-            log_file.write(f"Message: {refund_response.message}\n")
+    """Appends one record per transaction or refund to 'path'.
+
+    'log_format' is "text" (the original human-readable lines), "jsonl" or "binary"
+    (length-prefixed TransactionRecords, see loggers.records). 'processor' and 'latency'
+    (seconds) are only kept by the structured formats.
+    """
+
+    def __init__(self, path: str = "transactions.log", log_format: str = "text"):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.path = path
+        self.log_format = log_format
+
+    def log_transaction(
+        self,
+        customer_data: CustomerData,
+        payment_data: PaymentData,
+        payment_response: PaymentResponse,
+        processor: Optional[str] = None,
+        latency: Optional[float] = None,
+    ):
+        timestamp = time.time()
+        if self.log_format == "text":
+            return self._append(format_transaction(customer_data, payment_data, payment_response).encode("utf-8"), timestamp)
+        record = TransactionRecord(
+            timestamp=timestamp,
+            kind="charge",
+            transaction_id=payment_response.transaction_id,
+            customer=customer_data.name,
+            amount=payment_data.amount,
+            currency=payment_data.currency,
+            status=payment_response.status,
+            processor=processor,
+            latency_ms=None if latency is None else latency * 1000,
+            message=payment_response.message,
+        )
+        return self._append(encode_record(record, self.log_format), timestamp)
+
+    def log_refund(
+        self,
+        transaction_id: str,
+        refund_response: PaymentResponse,
+        processor: Optional[str] = None,
+        latency: Optional[float] = None,
+    ):
+        timestamp = time.time()
+        if self.log_format == "text":
+            return self._append(format_refund(transaction_id, refund_response).encode("utf-8"), timestamp)
+        record = TransactionRecord(
+            timestamp=timestamp,
+            kind="refund",
+            transaction_id=transaction_id,
+            customer="",
+            # PaymentResponse.amount is a float; records hold whole minor units like PaymentData.amount.
+            amount=round(refund_response.amount),
+            currency=refund_response.currency or "",
+            status=refund_response.status,
+            processor=processor,
+            latency_ms=None if latency is None else latency * 1000,
+            message=refund_response.message,
+        )
+        return self._append(encode_record(record, self.log_format), timestamp)
 
+    def _append(self, record: bytes, timestamp: float):
+        # One write per record, so concurrent loggers never interleave a record's lines.
+        with open(self.path, "ab") as log_file:
+            if self.log_format == "binary" and log_file.tell() == 0:
+                log_file.write(BINARY_MAGIC)
+            log_file.write(record)
@@ -1,18 +1,17 @@
 from .commons import ContactInfo, CustomerData, PaymentData, PaymentType
 from .service import PaymentService
 from .processors import StripePaymentProcessor
-from .notifiers import EmailNotifier, SMSNotifier
+from .notifiers import EmailNotifier, MultiChannelNotifier, SMSNotifier
 from .loggers import TransactionLogger
 from .validators import CustomerValidator, PaymentDataValidator
 
 
-def get_notifier_strategy(customer_data: CustomerData) -> EmailNotifier | SMSNotifier:
-    """Factory function to select the appropriate notification strategy based on customer data."""
-    if customer_data.contact_info.email:
-        return EmailNotifier()
-    if customer_data.contact_info.phone:
-        return SMSNotifier(gateway="SMSTwilio") 
-    raise ValueError("No valid notification strategy found for customer")
+def get_notifier_strategy(customer_data: CustomerData) -> MultiChannelNotifier:
+    """Factory function to build a notifier that reaches the customer on every channel it has (email and/or SMS)."""
+    notifier = MultiChannelNotifier.for_contacts(email=EmailNotifier(), sms=SMSNotifier(gateway="SMSTwilio"))
+    if not notifier.eligible_channels(customer_data):
+        raise ValueError("No valid notification strategy found for customer")
+    return notifier
 
 
 if __name__ == "__main__":
@@ -33,7 +32,7 @@ if __name__ == "__main__":
         currency="USD"
     )
     
-    # Initialize with email notification strategy (selected based on customer data)
+    # Initialize with a notifier covering every channel the customer has (email and SMS here)
     initial_notifier = get_notifier_strategy(customer_data)
     
     # Create PaymentService with initial strategy
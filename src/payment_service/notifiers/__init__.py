@@ -1,5 +1,43 @@
-from .notifier import NotifierProtocol
-from .email import EmailNotifier
+from .notifier import DigestNotifierProtocol, NotifierProtocol, QueuedNotifierProtocol
+from .email import EmailNotifier, RecipientError
+from .smtp_pool import RawEmail, SMTPConfig, SMTPConnectionPool
+from .templates import CompiledTemplate, TemplateCatalog, TemplateError, default_catalog
 from .sms import SMSNotifier
+from .sms_gateway import SMSDeliveryReport, SMSGatewayClient, SMSGatewayProtocol, SMSMessage
+from .dead_letter import DeadLetter, DeadLetterStore, InMemoryDeadLetterStore
+from .dispatch import DispatchMetrics, NotificationDispatcher
+from .coalescing import CoalescingNotifier
+from .outbox import NotificationOutbox, OutboxDeliveryWorkers, OutboxEntry
+from .multi_channel import Channel, ChannelResult, MultiChannelNotifier
 
-__all__ = ["NotifierProtocol", "EmailNotifier", "SMSNotifier"]
\ No newline at end of file
+__all__ = [
+    "NotifierProtocol",
+    "DigestNotifierProtocol",
+    "QueuedNotifierProtocol",
+    "EmailNotifier",
+    "RecipientError",
+    "RawEmail",
+    "SMTPConfig",
+    "SMTPConnectionPool",
+    "SMSNotifier",
+    "SMSDeliveryReport",
+    "SMSGatewayClient",
+    "SMSGatewayProtocol",
+    "SMSMessage",
+    "CompiledTemplate",
+    "TemplateCatalog",
+    "TemplateError",
+    "default_catalog",
+    "DeadLetter",
+    "DeadLetterStore",
+    "InMemoryDeadLetterStore",
+    "DispatchMetrics",
+    "NotificationDispatcher",
+    "CoalescingNotifier",
+    "Channel",
+    "ChannelResult",
+    "MultiChannelNotifier",
+    "NotificationOutbox",
+    "OutboxDeliveryWorkers",
+    "OutboxEntry",
+]
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+from payment_service.commons import CustomerData, PaymentData
+from payment_service.resilience.retry import RetryPolicy
+from .dead_letter import DeadLetter, DeadLetterStore, InMemoryDeadLetterStore
+from .notifier import DigestNotifierProtocol, NotifierProtocol
+
+
+@dataclass
+class _Pending:
+    customer_data: CustomerData
+    notifications: list[tuple[PaymentData, str]]
+    due_at: float
+
+
+class CoalescingNotifier(NotifierProtocol):
+    """Merges notifications to the same contact that arrive within 'window' seconds into one digest.
+
+    The window opens with a contact's first notification; when it closes a lone notification
+    is sent as usual and several go out through the wrapped notifier's send_digest (or one by
+    one if it has none). Memory is bounded: a contact that reaches 'max_per_digest' is flushed
+    at once, and when 'max_contacts' are pending the oldest is flushed to make room. close()
+    flushes everything still pending.
+
+    Every send, including those triggered by send_notification, runs on a pool of 'senders'
+    threads, so neither the caller nor the window timer waits on a slow backend.
+    Sends happen after send_notification has returned, so a caller such as
+    NotificationDispatcher never sees their failures. Failed sends are therefore retried here
+    with 'retry_policy', and every notification of a send that runs out of attempts goes to
+    'dead_letters'.
+    """
+
+    def __init__(
+        self,
+        notifier: Any,
+        window: float = 30.0,
+        max_contacts: int = 10_000,
+        max_per_digest: int = 50,
+        retry_policy: Optional[RetryPolicy] = None,
+        dead_letters: Optional[DeadLetterStore] = None,
+        senders: int = 4,
+    ):
+        self.notifier = notifier
+        self.window = window
+        self.max_contacts = max_contacts
+        self.max_per_digest = max_per_digest
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=10.0)
+        self.dead_letters = dead_letters if dead_letters is not None else InMemoryDeadLetterStore()
+        # Insertion order is window-opening order, so the head is always the next one due.
+        self._pending: OrderedDict[str, _Pending] = OrderedDict()
+        self._counts = {"received": 0, "messages": 0, "digests": 0, "retried": 0, "dead_lettered": 0}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._senders = ThreadPoolExecutor(max_workers=senders, thread_name_prefix="notify-coalesce-send")
+        self._flusher = threading.Thread(target=self._flush_due, name="notify-coalesce", daemon=True)
+        self._flusher.start()
+
+    def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CoalescingNotifier is closed")
+            self._counts["received"] += 1
+            key = _contact_key(customer_data)
+            pending = self._pending.get(key)
+            if pending is None:
+                if len(self._pending) >= self.max_contacts:
+                    self._senders.submit(self._send, self._pending.popitem(last=False)[1])
+                pending = _Pending(customer_data, [], time.monotonic() + self.window)
+                self._pending[key] = pending
+                self._cond.notify()
+            pending.notifications.append((payment_data, transaction_id))
+            if len(pending.notifications) >= self.max_per_digest:
+                self._senders.submit(self._send, self._pending.pop(key))
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(entry.notifications) for entry in self._pending.values())
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return dict(self._counts, pending_contacts=len(self._pending))
+
+    def flush(self):
+        """Send everything pending now, regardless of window, and wait for those sends."""
+        with self._cond:
+            sends = [self._senders.submit(self._send, entry) for entry in self._pending.values()]
+            self._pending.clear()
+        for send in sends:
+            send.result()
+
+    def close(self):
+        # Sends are only submitted while holding '_cond' and not closed, so after this block
+        # the pool has every send it will get and shutdown waits for all of them.
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._flusher.join()
+        self.flush()
+        self._senders.shutdown(wait=True)
+        close = getattr(self.notifier, "close", None)
+        if close is not None:
+            close()
+
+    def _flush_due(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        wait = next(iter(self._pending.values())).due_at - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                now = time.monotonic()
+                while self._pending and next(iter(self._pending.values())).due_at <= now:
+                    self._senders.submit(self._send, self._pending.popitem(last=False)[1])
+
+    def _send(self, entry: _Pending):
+        notifications = entry.notifications
+        for attempt in range(self.retry_policy.max_attempts):
+            try:
+                self._deliver(entry.customer_data, notifications)
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.retry_policy.max_attempts:
+                    self._count("retried")
+                    time.sleep(self.retry_policy.backoff(attempt))
+                continue
+            with self._cond:
+                self._counts["messages"] += 1
+                if len(notifications) > 1:
+                    self._counts["digests"] += 1
+            return
+        print(f"Notification to {_contact_key(entry.customer_data)} failed, moving to dead letters:", error)
+        for payment_data, transaction_id in notifications:
+            self.dead_letters.add(
+                DeadLetter(entry.customer_data, payment_data, transaction_id, str(error), self.retry_policy.max_attempts)
+            )
+            self._count("dead_lettered")
+
+    def _deliver(self, customer_data: CustomerData, notifications: list[tuple[PaymentData, str]]):
+        if len(notifications) == 1:
+            payment_data, transaction_id = notifications[0]
+            self.notifier.send_notification(customer_data, payment_data, transaction_id)
+        elif isinstance(self.notifier, DigestNotifierProtocol):
+            self.notifier.send_digest(customer_data, notifications)
+        else:
+            for payment_data, transaction_id in notifications:
+                self.notifier.send_notification(customer_data, payment_data, transaction_id)
+
+    def _count(self, name: str):
+        with self._cond:
+            self._counts[name] += 1
+
+
+def _contact_key(customer_data: CustomerData) -> str:
+    contact = customer_data.contact_info
+    return contact.email or contact.phone or customer_data.customer_id or customer_data.name
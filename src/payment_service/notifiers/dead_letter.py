@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Protocol
+from payment_service.commons import CustomerData, PaymentData
+
+
+@dataclass
+class DeadLetter:
+    customer_data: CustomerData
+    payment_data: PaymentData
+    transaction_id: Optional[str]
+    error: str
+    attempts: int
+    failed_at: float = field(default_factory=time.time)
+
+
+class DeadLetterStore(Protocol):
+    """Protocol for keeping notifications that could not be delivered."""
+
+    def add(self, dead_letter: DeadLetter) -> None:
+        ...
+
+
+class InMemoryDeadLetterStore(DeadLetterStore):
+    """Keeps the most recent 'max_size' dead letters; older ones are discarded."""
+
+    def __init__(self, max_size: int = 10_000):
+        self._items: deque[DeadLetter] = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+
+    def add(self, dead_letter: DeadLetter) -> None:
+        with self._lock:
+            self._items.append(dead_letter)
+
+    def drain(self) -> list[DeadLetter]:
+        """Remove and return every stored dead letter, e.g. to replay them."""
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+from payment_service.commons import CustomerData, PaymentData
+from payment_service.resilience.retry import RetryPolicy
+from .dead_letter import DeadLetter, DeadLetterStore, InMemoryDeadLetterStore
+from .notifier import NotifierProtocol, QueuedNotifierProtocol
+
+_STOP = object()
+
+
+@dataclass
+class DispatchMetrics:
+    queue_depth: int
+    enqueued: int
+    delivered: int
+    retried: int
+    dead_lettered: int
+    # Seconds from enqueue to successful delivery over the most recent deliveries.
+    latency_p50: float
+    latency_p99: float
+    latency_max: float
+
+
+class NotificationDispatcher(NotifierProtocol):
+    """Sends notifications from a bounded in-process queue on a pool of worker threads.
+
+    send_notification only enqueues, so a slow or failing SMTP/SMS backend no longer adds
+    to payment latency or turns a successful charge into an exception. Failed deliveries
+    are retried with backoff; a notification that runs out of attempts, or still finds
+    the queue full after 'enqueue_timeout' seconds, goes to the dead-letter store.
+
+    A QueuedNotifierProtocol notifier (e.g. SMSNotifier) is only handed each message: its
+    outcome arrives later on a Future, so workers keep feeding the backend's batches and a
+    failed message is resubmitted after its backoff from a timer.
+    """
+
+    def __init__(
+        self,
+        notifier: Any,
+        workers: int = 4,
+        max_queue: int = 10_000,
+        retry_policy: Optional[RetryPolicy] = None,
+        dead_letters: Optional[DeadLetterStore] = None,
+        latency_window: int = 1024,
+        enqueue_timeout: float = 0.0,
+    ):
+        self.notifier = notifier
+        self.enqueue_timeout = enqueue_timeout
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=10.0)
+        self.dead_letters = dead_letters if dead_letters is not None else InMemoryDeadLetterStore()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._counts = {"enqueued": 0, "delivered": 0, "retried": 0, "dead_lettered": 0}
+        self._lock = threading.Lock()
+        # Accepted notifications not yet delivered or dead-lettered, including those whose
+        # outcome a queued notifier has yet to report; close() waits for it to reach zero.
+        self._unsettled = 0
+        self._settled = threading.Condition(self._lock)
+        # Guards '_closed' and counts senders between that check and their put, so close()
+        # queues the stop markers only after every accepted notification is in the queue.
+        self._accepting = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"notify-{index}", daemon=True) for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> None:
+        with self._accepting:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._in_flight += 1
+        if closed:
+            # Shutting down: keep the notification for replay instead of failing a successful charge.
+            self._dead_letter(customer_data, payment_data, transaction_id, "NotificationDispatcher is closed", 0)
+            return
+        with self._lock:
+            self._unsettled += 1
+        try:
+            job = (customer_data, payment_data, transaction_id, time.monotonic())
+            self._queue.put(job, block=self.enqueue_timeout > 0, timeout=self.enqueue_timeout or None)
+        except queue.Full:
+            self._dead_letter(customer_data, payment_data, transaction_id, "Notification queue full", 0)
+            self._settle()
+            return
+        finally:
+            with self._accepting:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._accepting.notify_all()
+        self._count("enqueued")
+
+    def metrics(self) -> DispatchMetrics:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self._counts)
+        return DispatchMetrics(
+            queue_depth=self._queue.qsize(),
+            latency_p50=_percentile(latencies, 0.50),
+            latency_p99=_percentile(latencies, 0.99),
+            latency_max=latencies[-1] if latencies else 0.0,
+            **counts,
+        )
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting notifications, deliver what is queued, stop the workers, then close the wrapped notifier.
+
+        Notifications sent after close go straight to the dead-letter store.
+        """
+        with self._accepting:
+            self._closed = True
+            while self._in_flight:
+                self._accepting.wait()
+        with self._settled:
+            self._settled.wait_for(lambda: not self._unsettled, timeout)
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+        close = getattr(self.notifier, "close", None)
+        if close is not None:
+            close()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            if isinstance(self.notifier, QueuedNotifierProtocol):
+                self._submit(job, 0)
+            else:
+                self._deliver(*job)
+
+    def _deliver(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str, enqueued_at: float):
+        for attempt in range(self.retry_policy.max_attempts):
+            try:
+                self.notifier.send_notification(customer_data, payment_data, transaction_id)
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.retry_policy.max_attempts:
+                    self._count("retried")
+                    time.sleep(self.retry_policy.backoff(attempt))
+                continue
+            self._delivered(enqueued_at)
+            return
+        self._give_up(customer_data, payment_data, transaction_id, error)
+
+    def _submit(self, job: tuple, attempt: int):
+        try:
+            future = self.notifier.submit_notification(*job[:3])
+        except Exception as e:
+            self._failed(job, attempt, e)
+            return
+        if future is None:
+            self._delivered(job[3])
+            return
+        future.add_done_callback(lambda done: self._reported(job, attempt, done))
+
+    def _reported(self, job: tuple, attempt: int, future):
+        error = future.exception()
+        if error is None:
+            self._delivered(job[3])
+        else:
+            self._failed(job, attempt, error)
+
+    def _failed(self, job: tuple, attempt: int, error: BaseException):
+        # Runs on the notifier's reporting thread: schedule the retry rather than sleeping there.
+        if attempt + 1 >= self.retry_policy.max_attempts:
+            self._give_up(*job[:3], error)
+            return
+        self._count("retried")
+        retry = threading.Timer(self.retry_policy.backoff(attempt), self._submit, (job, attempt + 1))
+        retry.daemon = True
+        retry.start()
+
+    def _delivered(self, enqueued_at: float):
+        with self._lock:
+            self._counts["delivered"] += 1
+            self._latencies.append(time.monotonic() - enqueued_at)
+        self._settle()
+
+    def _give_up(self, customer_data, payment_data, transaction_id, error: BaseException):
+        print("Notification failed, moving to dead letters:", error)
+        self._dead_letter(customer_data, payment_data, transaction_id, str(error), self.retry_policy.max_attempts)
+        self._settle()
+
+    def _settle(self):
+        with self._settled:
+            self._unsettled -= 1
+            if not self._unsettled:
+                self._settled.notify_all()
+
+    def _dead_letter(self, customer_data, payment_data, transaction_id, error: str, attempts: int):
+        self.dead_letters.add(DeadLetter(customer_data, payment_data, transaction_id, error, attempts))
+        self._count("dead_lettered")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
@@ -1,17 +1,122 @@
+from dataclasses import dataclass, field
+from email.header import Header
+from email.utils import formataddr
+from typing import Iterable, Optional, Sequence
 from payment_service.commons import CustomerData, PaymentData
-from .notifier import NotifierProtocol
-from email.mime.text import MIMEText
+from .notifier import DigestNotifierProtocol, NotifierProtocol
+from .smtp_pool import RawEmail, SMTPConnectionPool
+from .templates import TemplateCatalog, default_catalog, digest_fields, receipt_fields
+
+
+class RecipientError(ValueError):
+    """The customer has no email address, or one that cannot be put in a header safely."""
+    pass
+
+@dataclass
+class EmailNotifier(NotifierProtocol, DigestNotifierProtocol):
+    # Without a pool the email is only printed, as before.
+    smtp_pool: Optional[SMTPConnectionPool] = None
+    # Overrides the catalog's 'receipt.email.sender'.
+    sender: Optional[str] = None
+    templates: TemplateCatalog = field(default_factory=default_catalog)
+    # Rendered header block per (template prefix, locale): everything except To (and Subject, if it has fields).
+    _headers: dict[tuple[str, Optional[str]], tuple[str, bytes]] = field(init=False, default_factory=dict, repr=False)
 
-class EmailNotifier(NotifierProtocol):
     def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str): 
-        msg_body = f"This is a confirmation of your recent payment. \nAmount processed: {payment_data.currency} {payment_data.amount}. \nTransaction ID: {transaction_id}.\nThank you for your business!"
-        msg = MIMEText(msg_body)
-        msg["Subject"] = "Payment Confirmation"
-        msg["From"] = "no-reply@example.com"
-        msg["To"] = customer_data.contact_info.email  
-
-        # server = smtplib.SMTP('smtp.localhost.com')
-        # server.send_message(msg)
-        # server.quit()
-        print("Email sent to:", customer_data.contact_info.email) 
-        print("Email body:", msg_body)
\ No newline at end of file
+        fields = receipt_fields(customer_data, payment_data, transaction_id)
+        if self.smtp_pool is None:
+            print("Email sent to:", customer_data.contact_info.email) 
+            print("Email body:", self.templates.render("receipt.email.body", customer_data.locale, fields))
+            return
+        self.smtp_pool.send(self._render("receipt", customer_data, fields))
+        print("Email sent to:", customer_data.contact_info.email)
+
+    def send_many(self, notifications: Iterable[tuple[CustomerData, PaymentData, str]]) -> int:
+        """Send one confirmation per (customer, payment, transaction id) over a single SMTP session.
+
+        Returns how many were accepted by the server; invalid and rejected addresses are reported and skipped.
+        """
+        emails = []
+        for customer_data, payment_data, transaction_id in notifications:
+            try:
+                emails.append(self._render("receipt", customer_data, receipt_fields(customer_data, payment_data, transaction_id)))
+            except RecipientError as e:
+                print("Email skipped:", e)
+        if self.smtp_pool is None:
+            for email in emails:
+                print("Email sent to:", email.recipients[0])
+            return len(emails)
+        rejected = self.smtp_pool.send_many(emails)
+        for index, error in rejected.items():
+            print("Email rejected for", emails[index].recipients[0], error)
+        return len(emails) - len(rejected)
+
+    def send_digest(self, customer_data: CustomerData, notifications: Sequence[tuple[PaymentData, str]]):
+        """One summary email for several payments by the same customer."""
+        fields = digest_fields(self.templates, customer_data, notifications)
+        if self.smtp_pool is None:
+            print("Email digest sent to:", customer_data.contact_info.email)
+            print("Email body:", self.templates.render("digest.email.body", customer_data.locale, fields))
+            return
+        self.smtp_pool.send(self._render("digest", customer_data, fields))
+        print(f"Email digest of {len(notifications)} payments sent to:", customer_data.contact_info.email)
+
+    def close(self):
+        if self.smtp_pool is not None:
+            self.smtp_pool.close()
+
+    def _render(self, prefix: str, customer_data: CustomerData, fields: dict) -> RawEmail:
+        locale = customer_data.locale
+        sender, headers = self._headers.get((prefix, locale)) or self._build_headers(prefix, locale)
+        subject = self.templates.get(f"{prefix}.email.subject", locale)
+        recipient, to_header = _recipient(customer_data)
+        parts = [headers, b"To: ", to_header, b"\r\n"]
+        if not subject.static:
+            parts += [b"Subject: ", _header_value(subject.render(fields)), b"\r\n"]
+        body = self.templates.render(f"{prefix}.email.body", locale, fields).replace("\n", "\r\n").encode("utf-8")
+        parts += [b"\r\n", body]
+        return RawEmail(sender, [recipient], b"".join(parts), () if body.isascii() else ("BODY=8BITMIME",))
+
+    def _build_headers(self, prefix: str, locale: Optional[str]) -> tuple[str, bytes]:
+        sender = self.sender or self.templates.render("receipt.email.sender", locale, {})
+        lines = [
+            b'Content-Type: text/plain; charset="utf-8"',
+            b"MIME-Version: 1.0",
+            b"Content-Transfer-Encoding: 8bit",
+            b"From: " + sender.encode("ascii"),
+        ]
+        subject = self.templates.get(f"{prefix}.email.subject", locale)
+        if subject.static:
+            lines.append(b"Subject: " + _header_value(subject.render({})))
+        entry = (sender, b"\r\n".join(lines) + b"\r\n")
+        self._headers[(prefix, locale)] = entry
+        return entry
+
+
+def _recipient(customer_data: CustomerData) -> tuple[str, bytes]:
+    """The envelope address and the encoded To header value for a customer."""
+    address = customer_data.contact_info.email
+    if not address:
+        raise RecipientError(f"Customer {customer_data.name!r} has no email address")
+    # A line break would end the To header and let the address inject headers of its own.
+    if any(ord(char) < 0x20 or char == "\x7f" for char in address):
+        raise RecipientError(f"Email address for {customer_data.name!r} contains control characters")
+    local, at, domain = address.rpartition("@")
+    if not at or not local or not domain:
+        raise RecipientError(f"Invalid email address for {customer_data.name!r}: {address!r}")
+    if not local.isascii():
+        raise RecipientError(f"Email address {address!r} needs SMTPUTF8, which is not supported")
+    try:
+        address = f"{local}@{domain.encode('idna').decode('ascii')}"
+    except UnicodeError as e:
+        raise RecipientError(f"Invalid email domain {domain!r}: {e}") from None
+    # The display name is free text too; fold any whitespace (line breaks included) to single spaces.
+    name = " ".join(customer_data.name.split())
+    return address, formataddr((name, address), "utf-8").encode("ascii")
+
+
+def _header_value(text: str) -> bytes:
+    # Non-ASCII header text must be RFC 2047 encoded.
+    if text.isascii():
+        return text.encode("ascii")
+    return Header(text, "utf-8").encode().encode("ascii")
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+from payment_service.commons import CustomerData, PaymentData
+from .notifier import DigestNotifierProtocol, NotifierProtocol
+
+
+@dataclass
+class Channel:
+    name: str
+    notifier: Any
+    # Whether this channel can reach the customer, e.g. has an email address.
+    eligible: Callable[[CustomerData], bool]
+    timeout: float = 10.0
+
+
+@dataclass
+class ChannelResult:
+    channel: str
+    # "sent", "failed" or "timeout"; a timed-out send may still complete in the background.
+    status: str
+    elapsed: float
+    error: Optional[str] = None
+
+
+class MultiChannelNotifier(NotifierProtocol, DigestNotifierProtocol):
+    """Notifies a customer on every channel it is reachable on, concurrently.
+
+    Channels run side by side on a shared thread pool, so a notification takes as long as
+    the slowest channel rather than the sum. Each channel has its own timeout and its
+    failures are reported without affecting the others; only when every eligible channel
+    fails does send_notification raise, so a retrying caller never re-sends a channel
+    that already succeeded.
+    """
+
+    def __init__(self, channels: Sequence[Channel] = (), max_workers: int = 8):
+        self.channels = list(channels)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notify-channel")
+
+    @classmethod
+    def for_contacts(cls, email: Optional[Any] = None, sms: Optional[Any] = None, **kwargs) -> "MultiChannelNotifier":
+        """Email to customers with an address and SMS to customers with a phone number."""
+        channels = []
+        if email is not None:
+            channels.append(Channel("email", email, lambda customer: bool(customer.contact_info.email)))
+        if sms is not None:
+            channels.append(Channel("sms", sms, lambda customer: bool(customer.contact_info.phone)))
+        return cls(channels, **kwargs)
+
+    def add_channel(self, channel: Channel):
+        self.channels.append(channel)
+
+    def eligible_channels(self, customer_data: CustomerData) -> list[Channel]:
+        return [channel for channel in self.channels if channel.eligible(customer_data)]
+
+    def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> None:
+        self.deliver(customer_data, lambda notifier: notifier.send_notification(customer_data, payment_data, transaction_id))
+
+    def send_digest(self, customer_data: CustomerData, notifications: Sequence[tuple[PaymentData, str]]) -> None:
+        self.deliver(customer_data, lambda notifier: _send_digest(notifier, customer_data, notifications))
+
+    def deliver(self, customer_data: CustomerData, send: Callable[[Any], None]) -> list[ChannelResult]:
+        """Run 'send' against every eligible channel's notifier at once and report each outcome."""
+        channels = self.eligible_channels(customer_data)
+        if not channels:
+            print("No notification channel available for", customer_data.name)
+            return []
+        started = time.monotonic()
+        futures: list[tuple[Channel, Future]] = [
+            (channel, self._executor.submit(send, channel.notifier)) for channel in channels
+        ]
+        results = []
+        for channel, future in futures:
+            # Every channel started at the same time, so its budget is measured from 'started'.
+            remaining = max(0.0, started + channel.timeout - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+                results.append(ChannelResult(channel.name, "sent", time.monotonic() - started))
+            except FutureTimeoutError:
+                print(f"Notification via {channel.name} timed out after {channel.timeout}s")
+                results.append(ChannelResult(channel.name, "timeout", time.monotonic() - started, "timed out"))
+            except Exception as e:
+                print(f"Notification via {channel.name} failed:", e)
+                results.append(ChannelResult(channel.name, "failed", time.monotonic() - started, str(e)))
+        if all(result.status != "sent" for result in results):
+            summary = "; ".join(f"{result.channel}: {result.error}" for result in results)
+            raise RuntimeError(f"All notification channels failed ({summary})")
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for channel in self.channels:
+            close = getattr(channel.notifier, "close", None)
+            if close is not None:
+                close()
+
+
+def _send_digest(notifier: Any, customer_data: CustomerData, notifications: Sequence[tuple[PaymentData, str]]):
+    if isinstance(notifier, DigestNotifierProtocol):
+        notifier.send_digest(customer_data, notifications)
+        return
+    for payment_data, transaction_id in notifications:
+        notifier.send_notification(customer_data, payment_data, transaction_id)
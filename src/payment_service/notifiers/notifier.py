@@ -1,4 +1,5 @@
-from typing import Protocol
+from concurrent.futures import Future
+from typing import Optional, Protocol, Sequence, runtime_checkable
 from payment_service.commons import CustomerData, PaymentData
 
 class NotifierProtocol(Protocol):
@@ -7,5 +8,21 @@ class NotifierProtocol(Protocol):
     This protocol defines the interface for notification.
     Should provide a method 'send_notification' that returns ConsumerData.
     """
-    def send_notifcation(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> None:
-        ...
\ No newline at end of file
+    def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> None:
+        ...
+
+@runtime_checkable
+class DigestNotifierProtocol(Protocol):
+    """Notifiers that can merge several payments to one customer into a single message."""
+    def send_digest(self, customer_data: CustomerData, notifications: Sequence[tuple[PaymentData, str]]) -> None:
+        ...
+
+@runtime_checkable
+class QueuedNotifierProtocol(Protocol):
+    """Notifiers that queue a message and learn its outcome later.
+
+    submit_notification returns without waiting: the Future resolves to None once the message
+    is delivered and raises if it failed; None means nothing was queued (e.g. no contact).
+    """
+    def submit_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> Optional[Future]:
+        ...
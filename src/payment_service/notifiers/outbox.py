@@ -0,0 +1,307 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse
+from payment_service.resilience.retry import RetryPolicy
+
+
+@dataclass
+class OutboxEntry:
+    """A claimed notification intent; 'claim_token' identifies this lease of it."""
+    id: int
+    claim_token: str
+    transaction_id: Optional[str]
+    customer_data: CustomerData
+    payment_data: PaymentData
+    # Deliveries attempted so far, including the current one.
+    attempts: int
+
+
+class _Batch:
+    __slots__ = ("rows", "done", "error")
+
+    def __init__(self):
+        self.rows: list[tuple] = []
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class NotificationOutbox:
+    """Durable record of every transaction and the receipt owed for it, in SQLite.
+
+    record writes the transaction row and its notification intent in the same SQLite
+    transaction. Concurrent callers are group-committed by one writer thread, with up to
+    'max_batch' records per commit; each batch commits or fails as a whole, and each caller
+    returns once its batch is on disk.
+    Delivery workers claim due intents in bulk. A claim is a lease: the intent's
+    'available_at' moves 'lease' seconds ahead, so intents held by a crashed worker come
+    back on their own. Due intents are found through a partial index over pending rows
+    only, so claiming stays cheap however much delivered history the table holds.
+    """
+
+    def __init__(self, path: str = "notification_outbox.db", lease: float = 60.0, max_batch: int = 1000):
+        self.path = path
+        self.lease = lease
+        self.max_batch = max_batch
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS outbox_transactions (
+                    id INTEGER PRIMARY KEY,
+                    transaction_id TEXT,
+                    customer_name TEXT NOT NULL,
+                    amount INTEGER NOT NULL,
+                    currency TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    message TEXT,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY,
+                    transaction_id TEXT,
+                    customer TEXT NOT NULL,
+                    payment TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    claim_token TEXT,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (available_at) WHERE status = 'pending'"
+            )
+        self._open = _Batch()
+        # Batches that reached 'max_batch' rows, waiting for the writer in arrival order.
+        self._full: deque[_Batch] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_batches, name="outbox-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, customer_data: CustomerData, payment_data: PaymentData, response: PaymentResponse, wait: bool = True):
+        """Store the transaction and its receipt intent; with 'wait', return once both are committed."""
+        now = time.time()
+        row = (
+            response.transaction_id,
+            customer_data.name,
+            payment_data.amount,
+            payment_data.currency,
+            response.status,
+            response.message,
+            customer_data.model_dump_json(),
+            payment_data.model_dump_json(),
+            now,
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("NotificationOutbox is closed")
+            if len(self._open.rows) >= self.max_batch:
+                self._full.append(self._open)
+                self._open = _Batch()
+            batch = self._open
+            batch.rows.append(row)
+            self._cond.notify()
+        if wait:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+
+    def claim(self, limit: int) -> list[OutboxEntry]:
+        """Lease up to 'limit' due intents, oldest first."""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "UPDATE outbox SET available_at = ?, attempts = attempts + 1, claim_token = ?, updated_at = ? "
+                "WHERE id IN ("
+                "    SELECT id FROM outbox WHERE status = 'pending' AND available_at <= ? ORDER BY available_at LIMIT ?"
+                ") RETURNING id, transaction_id, customer, payment, attempts",
+                (now + self.lease, token, now, now, limit),
+            ).fetchall()
+        return [
+            OutboxEntry(
+                outbox_id,
+                token,
+                transaction_id,
+                CustomerData.model_validate_json(customer),
+                PaymentData.model_validate_json(payment),
+                attempts,
+            )
+            for outbox_id, transaction_id, customer, payment, attempts in rows
+        ]
+
+    def complete(self, entries: list[OutboxEntry]):
+        """Mark delivered intents done. Entries whose lease was since taken by another worker are left alone."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE outbox SET status = 'done', claim_token = NULL, updated_at = ? WHERE id = ? AND claim_token = ?",
+                [(now, entry.id, entry.claim_token) for entry in entries],
+            )
+
+    def retry(self, failures: list[tuple[OutboxEntry, float, str]]):
+        """Return failed intents to pending, each due after its delay: (entry, delay, error)."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE outbox SET available_at = ?, last_error = ?, claim_token = NULL, updated_at = ? "
+                "WHERE id = ? AND claim_token = ?",
+                [(now + delay, error, now, entry.id, entry.claim_token) for entry, delay, error in failures],
+            )
+
+    def dead_letter(self, failures: list[tuple[OutboxEntry, str]]):
+        """Give up on intents that ran out of attempts: (entry, error)."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE outbox SET status = 'dead', last_error = ?, claim_token = NULL, updated_at = ? "
+                "WHERE id = ? AND claim_token = ?",
+                [(error, now, entry.id, entry.claim_token) for entry, error in failures],
+            )
+
+    def purge_done(self, older_than: float) -> int:
+        """Delete intents delivered more than 'older_than' seconds ago; transaction rows are kept."""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM outbox WHERE status = 'done' AND updated_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def close(self):
+        """Commit whatever is buffered, then close the database."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        with self._lock:
+            self._connection.close()
+
+    def _write_batches(self):
+        # Records arriving while a batch commits pile up in the next one: one fsync per batch, not per record.
+        while True:
+            with self._cond:
+                while not self._full and not self._open.rows and not self._closed:
+                    self._cond.wait()
+                if self._full:
+                    batch = self._full.popleft()
+                elif self._open.rows:
+                    batch, self._open = self._open, _Batch()
+                else:
+                    return
+            try:
+                self._insert(batch.rows)
+            except Exception as e:
+                print("Outbox write failed:", e)
+                batch.error = e
+            batch.done.set()
+
+    def _insert(self, rows: list[tuple]):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO outbox_transactions (transaction_id, customer_name, amount, currency, status, message, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row[:6] + (row[8],) for row in rows],
+            )
+            self._connection.executemany(
+                "INSERT INTO outbox (transaction_id, customer, payment, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(row[0], row[6], row[7], row[8], row[8], row[8]) for row in rows],
+            )
+
+
+class OutboxDeliveryWorkers:
+    """Threads that drain a NotificationOutbox through a notifier, at least once per intent.
+
+    Each worker claims up to 'claim_size' due intents, sends them and marks the successes
+    done in one write. Failures are put back with the retry policy's backoff, and an intent
+    that fails 'retry_policy.max_attempts' times is marked dead. A crash after sending but
+    before marking done means the receipt is sent again once the lease expires.
+    """
+
+    def __init__(
+        self,
+        outbox: NotificationOutbox,
+        notifier: Any,
+        workers: int = 2,
+        claim_size: int = 100,
+        retry_policy: Optional[RetryPolicy] = None,
+        poll_interval: float = 0.5,
+    ):
+        self.outbox = outbox
+        self.notifier = notifier
+        self.claim_size = claim_size
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=8, base_delay=1.0, max_delay=300.0)
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self._stop = threading.Event()
+        self._workers: list[threading.Thread] = []
+
+    def start(self):
+        # Threads can only run once, so every start gets fresh ones; a running set is left alone.
+        if self._workers:
+            return
+        self._stop.clear()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"outbox-{index}", daemon=True) for index in range(self.workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self):
+        """Finish the current claims and stop; unclaimed intents stay in the outbox for the next start."""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def deliver_once(self) -> int:
+        """Claim and deliver one batch; returns how many intents were claimed."""
+        entries = self.outbox.claim(self.claim_size)
+        delivered, retries, dead = [], [], []
+        for entry in entries:
+            try:
+                self.notifier.send_notification(entry.customer_data, entry.payment_data, entry.transaction_id)
+            except Exception as e:
+                if entry.attempts >= self.retry_policy.max_attempts:
+                    print("Notification failed, giving up:", e)
+                    dead.append((entry, str(e)))
+                else:
+                    retries.append((entry, self.retry_policy.backoff(entry.attempts - 1), str(e)))
+                continue
+            delivered.append(entry)
+        if delivered:
+            self.outbox.complete(delivered)
+        if retries:
+            self.outbox.retry(retries)
+        if dead:
+            self.outbox.dead_letter(dead)
+        return len(entries)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.deliver_once()
+            except sqlite3.Error as e:
+                print("Outbox claim failed:", e)
+                claimed = 0
+            if claimed < self.claim_size:
+                self._stop.wait(self.poll_interval)
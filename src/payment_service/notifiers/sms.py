@@ -1,14 +1,85 @@
-from dataclasses import dataclass
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence
 from payment_service.commons import CustomerData, PaymentData
-from .notifier import NotifierProtocol
+from .notifier import DigestNotifierProtocol, NotifierProtocol, QueuedNotifierProtocol
+from .sms_gateway import SMSGatewayClient
+from .templates import TemplateCatalog, default_catalog, digest_fields, receipt_fields
 
 @dataclass 
-class SMSNotifier(NotifierProtocol):
+class SMSNotifier(NotifierProtocol, DigestNotifierProtocol, QueuedNotifierProtocol):
+    # Name of a gateway registered on 'client'; without a client the SMS is only printed.
     gateway: str
+    client: Optional[SMSGatewayClient] = None
+    templates: TemplateCatalog = field(default_factory=default_catalog)
 
     def send_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str):
+        # Only queues the message; a failed delivery report is printed.
+        self.submit_notification(customer_data, payment_data, transaction_id)
+
+    def submit_notification(self, customer_data: CustomerData, payment_data: PaymentData, transaction_id: str) -> Optional[Future]:
+        """Queue the receipt and return a Future that raises if the gateway reports it failed.
+
+        Callers never block on the report, so concurrent receipts still fill the gateway's
+        batches; a NotificationDispatcher retries or dead-letters from the Future instead.
+        """
+        text = self.templates.render("receipt.sms", customer_data.locale, receipt_fields(customer_data, payment_data, transaction_id))
+        future = self._send(customer_data, text)
+        return None if future is None else _outcome(future)
+
+    def send_digest(self, customer_data: CustomerData, notifications: Sequence[tuple[PaymentData, str]]):
+        text = self.templates.render("digest.sms", customer_data.locale, digest_fields(self.templates, customer_data, notifications))
+        self._send(customer_data, text)
+
+    def send_many(self, notifications: Iterable[tuple[CustomerData, PaymentData, str]]) -> list:
+        """Queue one receipt per (customer, payment, transaction id); the client batches them per gateway.
+
+        Returns a Future of the SMSDeliveryReport per customer with a phone number, without
+        waiting; checking the reports is up to the caller.
+        """
+        futures = []
+        for customer_data, payment_data, transaction_id in notifications:
+            text = self.templates.render("receipt.sms", customer_data.locale, receipt_fields(customer_data, payment_data, transaction_id))
+            future = self._send(customer_data, text)
+            if future is not None:
+                futures.append(future)
+        return futures
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    def _send(self, customer_data: CustomerData, text: str):
+        # Returns the Future of the delivery report, or None when nothing was queued.
         phone_number = customer_data.contact_info.phone
         if not phone_number:
             print("No phone number provided")
-            return
-        print(f"SMS sent to {phone_number} via {self.gateway}: Thank you for your payment! \nAmount processed: {payment_data.currency} {payment_data.amount}. \nTransaction ID: {transaction_id}.")
+            return None
+        if self.client is None:
+            print(f"SMS sent to {phone_number} via {self.gateway}: {text}")
+            return None
+        future = self.client.send(self.gateway, phone_number, text)
+        future.add_done_callback(_report_failure)
+        return future
+
+
+def _report_failure(future):
+    report = future.result()
+    if report.status != "sent":
+        print(f"SMS to {report.to} via {report.gateway} failed:", report.error)
+
+
+def _outcome(report_future: Future) -> Future:
+    # The report future always resolves: the gateway lane answers every message it takes,
+    # failing those it got no report for, so there is no timeout to guess at and resend on.
+    outcome: Future = Future()
+
+    def settle(future):
+        report = future.result()
+        if report.status == "sent":
+            outcome.set_result(None)
+        else:
+            outcome.set_exception(RuntimeError(f"SMS to {report.to} via {report.gateway} failed: {report.error}"))
+
+    report_future.add_done_callback(settle)
+    return outcome
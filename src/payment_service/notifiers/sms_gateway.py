@@ -0,0 +1,179 @@
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Protocol, Sequence
+from payment_service.resilience.rate_limit import TokenBucket
+
+_STOP = object()
+
+
+@dataclass
+class SMSMessage:
+    to: str
+    text: str
+    message_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+@dataclass
+class SMSDeliveryReport:
+    message_id: str
+    to: str
+    gateway: str
+    # "sent" once the gateway accepted the message, "failed" otherwise.
+    status: str
+    error: Optional[str] = None
+    gateway_message_id: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+
+
+class SMSGatewayProtocol(Protocol):
+    """Protocol for an SMS provider's bulk submission API.
+
+    'bulk_size' is the most messages one submit_batch call may carry and 'rate_per_second'
+    the provider's throughput cap in messages. submit_batch returns one report per message,
+    matched by message_id (a message without one counts as failed); raising means the
+    whole batch failed.
+    """
+    name: str
+    bulk_size: int
+    rate_per_second: float
+
+    def submit_batch(self, messages: Sequence[SMSMessage]) -> list[SMSDeliveryReport]:
+        ...
+
+
+class _GatewayLane:
+    """One gateway's queue, rate budget and worker threads."""
+
+    def __init__(self, gateway: SMSGatewayProtocol, workers: int, linger: float):
+        self.gateway = gateway
+        self.linger = linger
+        self.queue: queue.Queue = queue.Queue()
+        # A full batch must fit in the bucket, or it could never be paid for.
+        self.bucket = TokenBucket(gateway.rate_per_second, capacity=max(gateway.rate_per_second, gateway.bulk_size))
+        self.workers = [
+            threading.Thread(target=self.work, name=f"sms-{gateway.name}-{index}", daemon=True) for index in range(workers)
+        ]
+        self.on_reports: Callable[[list[SMSDeliveryReport]], None] = lambda reports: None
+
+    def work(self):
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stop = self._fill(batch)
+            self._submit(batch)
+            if stop:
+                return
+
+    def _fill(self, batch: list) -> bool:
+        # Take whatever is already queued (waiting up to 'linger' for more) up to the bulk size.
+        linger_until = time.monotonic() + self.linger
+        while len(batch) < self.gateway.bulk_size:
+            try:
+                remaining = linger_until - time.monotonic()
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _submit(self, batch: list[tuple[SMSMessage, Future]]):
+        messages = [message for message, _ in batch]
+        self.bucket.acquire(len(messages))
+        try:
+            reports = self.gateway.submit_batch(messages)
+        except Exception as e:
+            reports = [
+                SMSDeliveryReport(message.message_id, message.to, self.gateway.name, "failed", error=str(e))
+                for message in messages
+            ]
+        # Match reports to messages by id: a gateway that drops or reorders reports must not
+        # leave a sender waiting forever.
+        by_id = {report.message_id: report for report in reports}
+        matched = []
+        for message, future in batch:
+            report = by_id.get(message.message_id)
+            if report is None:
+                report = SMSDeliveryReport(
+                    message.message_id, message.to, self.gateway.name, "failed", error="No delivery report from gateway"
+                )
+            matched.append(report)
+            future.set_result(report)
+        self.on_reports(matched)
+
+
+class SMSGatewayClient:
+    """Sends SMS through named gateways, batching up to each gateway's bulk size.
+
+    Every registered gateway gets its own queue, worker threads and token bucket at its
+    'rate_per_second', so a slow or saturated provider never holds up another. send returns
+    a Future for the message's SMSDeliveryReport; recent reports are also kept for status().
+    """
+
+    def __init__(self, linger: float = 0.01, max_reports: int = 100_000):
+        self.linger = linger
+        self._lanes: dict[str, _GatewayLane] = {}
+        self._reports: OrderedDict[str, SMSDeliveryReport] = OrderedDict()
+        self._max_reports = max_reports
+        self._counts = {"sent": 0, "failed": 0, "batches": 0}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def register(self, gateway: SMSGatewayProtocol, workers: int = 2):
+        if gateway.name in self._lanes:
+            raise ValueError(f"Gateway {gateway.name!r} is already registered")
+        lane = _GatewayLane(gateway, workers, self.linger)
+        lane.on_reports = self._record
+        self._lanes[gateway.name] = lane
+        for worker in lane.workers:
+            worker.start()
+
+    def gateways(self) -> list[str]:
+        return list(self._lanes)
+
+    def send(self, gateway: str, to: str, text: str) -> "Future[SMSDeliveryReport]":
+        if self._closed:
+            raise RuntimeError("SMSGatewayClient is closed")
+        lane = self._lanes.get(gateway)
+        if lane is None:
+            raise ValueError(f"Unknown SMS gateway: {gateway}")
+        future: Future = Future()
+        lane.queue.put((SMSMessage(to, text), future))
+        return future
+
+    def status(self, message_id: str) -> Optional[SMSDeliveryReport]:
+        with self._lock:
+            return self._reports.get(message_id)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["queued"] = sum(lane.queue.qsize() for lane in self._lanes.values())
+        return counts
+
+    def close(self):
+        """Send everything queued, then stop the workers."""
+        self._closed = True
+        for lane in self._lanes.values():
+            for _ in lane.workers:
+                lane.queue.put(_STOP)
+        for worker in itertools.chain.from_iterable(lane.workers for lane in self._lanes.values()):
+            worker.join()
+
+    def _record(self, reports: list[SMSDeliveryReport]):
+        with self._lock:
+            self._counts["batches"] += 1
+            for report in reports:
+                self._counts["sent" if report.status == "sent" else "failed"] += 1
+                self._reports[report.message_id] = report
+            while len(self._reports) > self._max_reports:
+                self._reports.popitem(last=False)
@@ -0,0 +1,160 @@
+import queue
+import smtplib
+import ssl
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Iterable, Iterator, Optional
+
+# Errors after which a session can't be trusted and is replaced. SMTPException itself is an
+# OSError, so refused recipients and other server replies are deliberately not listed.
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+@dataclass
+class SMTPConfig:
+    host: str = "localhost"
+    port: int = 25
+    use_tls: bool = False  # STARTTLS after connecting
+    use_ssl: bool = False  # implicit TLS (usually port 465)
+    username: Optional[str] = None
+    password: Optional[str] = field(default=None, repr=False)
+    timeout: float = 10.0
+    pool_size: int = 4
+    # Recycle a session after this many messages; many servers cap messages per connection.
+    max_messages_per_connection: int = 100
+    reconnect_attempts: int = 1
+
+
+@dataclass
+class RawEmail:
+    """A message already rendered to wire format (CRLF line endings), sent without email.message."""
+    sender: str
+    recipients: list[str]
+    data: bytes
+    mail_options: tuple[str, ...] = ()
+
+
+class _PooledConnection:
+    __slots__ = ("smtp", "sent")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of authenticated, persistent SMTP sessions.
+
+    Each handshake (TCP, TLS, AUTH) is paid once per connection rather than once per
+    email. A connection the server has dropped is discarded and the message is resent on a
+    fresh one.
+    """
+
+    def __init__(self, config: Optional[SMTPConfig] = None):
+        self.config = config or SMTPConfig()
+        self._idle: queue.LifoQueue[_PooledConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.config.pool_size)
+        self._closed = False
+
+    def send(self, message: Message | RawEmail):
+        with self.connection() as connection:
+            self._deliver(connection, message)
+
+    def send_many(self, messages: Iterable[Message | RawEmail]) -> dict[int, smtplib.SMTPException]:
+        """Send messages back to back over a single pooled session.
+
+        Returns the messages the server rejected, by position; the rest of the batch is
+        still sent. Connection failures that survive reconnecting are raised.
+        """
+        rejected = {}
+        with self.connection() as connection:
+            for index, message in enumerate(messages):
+                try:
+                    self._deliver(connection, message)
+                except _CONNECTION_ERRORS:
+                    raise
+                except smtplib.SMTPException as e:
+                    rejected[index] = e
+        return rejected
+
+    def _deliver(self, connection: _PooledConnection, message: Message | RawEmail):
+        for attempt in range(self.config.reconnect_attempts + 1):
+            try:
+                if connection.sent >= self.config.max_messages_per_connection:
+                    self._reset(connection)
+                if isinstance(message, RawEmail):
+                    connection.smtp.sendmail(message.sender, message.recipients, message.data, list(message.mail_options))
+                else:
+                    connection.smtp.send_message(message)
+                connection.sent += 1
+                return
+            except _CONNECTION_ERRORS:
+                # The server dropped the session (idle timeout, restart): resend on a fresh one.
+                if attempt == self.config.reconnect_attempts:
+                    raise
+                self._reset(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[_PooledConnection]:
+        if self._closed:
+            raise RuntimeError("SMTP pool is closed")
+        self._slots.acquire()
+        connection = None
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = _PooledConnection(self._connect())
+            yield connection
+        except BaseException as e:
+            if connection is not None and not _session_intact(e):
+                _quietly_close(connection.smtp)
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                self._idle.put(connection)
+            self._slots.release()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                connection.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                _quietly_close(connection.smtp)
+
+    def _reset(self, connection: _PooledConnection):
+        _quietly_close(connection.smtp)
+        connection.smtp = self._connect()
+        connection.sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        config = self.config
+        if config.use_ssl:
+            smtp = smtplib.SMTP_SSL(config.host, config.port, timeout=config.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(config.host, config.port, timeout=config.timeout)
+            if config.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+        if config.username:
+            smtp.login(config.username, config.password or "")
+        return smtp
+
+
+def _session_intact(error: BaseException) -> bool:
+    # A rejected message (bad recipient, policy reply) leaves the session usable.
+    return isinstance(error, smtplib.SMTPException) and not isinstance(error, smtplib.SMTPServerDisconnected)
+
+
+def _quietly_close(smtp: smtplib.SMTP):
+    try:
+        smtp.close()
+    except OSError:
+        pass
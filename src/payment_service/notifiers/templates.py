@@ -0,0 +1,238 @@
+import json
+import threading
+from pathlib import Path
+from string import Formatter
+from typing import Any, Mapping, Optional, Sequence
+
+# Built-in receipt copy; a template directory passed to TemplateCatalog overrides any entry.
+DEFAULT_TEMPLATES: dict[str, dict[str, str]] = {
+    "en": {
+        "receipt.email.sender": "no-reply@example.com",
+        "receipt.email.subject": "Payment Confirmation",
+        "receipt.email.body": (
+            "This is a confirmation of your recent payment. \n"
+            "Amount processed: {currency} {amount}. \n"
+            "Transaction ID: {transaction_id}.\n"
+            "Thank you for your business!"
+        ),
+        "receipt.sms": (
+            "Thank you for your payment! \n"
+            "Amount processed: {currency} {amount}. \n"
+            "Transaction ID: {transaction_id}."
+        ),
+        "digest.line": "{currency} {amount} - Transaction ID: {transaction_id}",
+        "digest.email.subject": "Payment Summary: {count} payments",
+        "digest.email.body": (
+            "This is a summary of your recent payments.\n"
+            "{lines}\n"
+            "Total processed: {totals}.\n"
+            "Thank you for your business!"
+        ),
+        "digest.sms": (
+            "Thank you for your {count} payments! \n"
+            "Total processed: {totals}. \n"
+            "Latest transaction ID: {transaction_id}."
+        ),
+    },
+    "es": {
+        "receipt.email.subject": "Confirmación de pago",
+        "receipt.email.body": (
+            "Esta es la confirmación de su pago reciente. \n"
+            "Importe procesado: {currency} {amount}. \n"
+            "ID de transacción: {transaction_id}.\n"
+            "¡Gracias por su preferencia!"
+        ),
+        "receipt.sms": (
+            "¡Gracias por su pago! \n"
+            "Importe procesado: {currency} {amount}. \n"
+            "ID de transacción: {transaction_id}."
+        ),
+        "digest.line": "{currency} {amount} - ID de transacción: {transaction_id}",
+        "digest.email.subject": "Resumen de pagos: {count} pagos",
+        "digest.email.body": (
+            "Este es el resumen de sus pagos recientes.\n"
+            "{lines}\n"
+            "Total procesado: {totals}.\n"
+            "¡Gracias por su preferencia!"
+        ),
+        "digest.sms": (
+            "¡Gracias por sus {count} pagos! \n"
+            "Total procesado: {totals}. \n"
+            "Último ID de transacción: {transaction_id}."
+        ),
+    },
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class CompiledTemplate:
+    """A str.format template parsed once into literal chunks and field lookups.
+
+    render only looks up and formats the fields and joins the pieces; nothing is re-parsed.
+    """
+    __slots__ = ("name", "locale", "source", "_literals", "_fields", "_text")
+
+    def __init__(self, name: str, locale: str, source: str):
+        self.name = name
+        self.locale = locale
+        self.source = source
+        literals, fields = [], []
+        try:
+            for literal, field_name, format_spec, conversion in Formatter().parse(source):
+                literals.append(literal)
+                if field_name is not None:
+                    if not field_name.isidentifier() or conversion or "{" in (format_spec or ""):
+                        raise TemplateError(f"Template {name!r} ({locale}): only plain {{field}} or {{field:spec}} is supported")
+                    fields.append((field_name, format_spec))
+        except ValueError as e:
+            if isinstance(e, TemplateError):
+                raise
+            raise TemplateError(f"Template {name!r} ({locale}) is malformed: {e}") from e
+        if len(literals) == len(fields):
+            literals.append("")
+        self._literals = tuple(literals)
+        self._fields = tuple(fields)
+        self._text = "".join(literals) if not fields else None
+
+    @property
+    def static(self) -> bool:
+        return self._text is not None
+
+    @property
+    def field_names(self) -> tuple[str, ...]:
+        return tuple(name for name, _ in self._fields)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        if self._text is not None:
+            return self._text
+        pieces = [self._literals[0]]
+        try:
+            for (name, spec), literal in zip(self._fields, self._literals[1:]):
+                value = values[name]
+                pieces.append(format(value, spec) if spec else str(value))
+                pieces.append(literal)
+        except KeyError as e:
+            raise TemplateError(f"Template {self.name!r} ({self.locale}) needs field {e.args[0]!r}") from None
+        return "".join(pieces)
+
+
+class TemplateCatalog:
+    """Receipt templates by name and locale, compiled on first use and cached.
+
+    'directory' holds one '<locale>.json' file per locale mapping template names to text,
+    so copy can change without a code edit. A lookup falls back from 'pt-BR' to 'pt' to
+    'default_locale'.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str | Path] = None,
+        default_locale: str = "en",
+        templates: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ):
+        self.default_locale = _normalize_locale(default_locale)
+        self._sources: dict[str, dict[str, str]] = {}
+        for locale, entries in (templates if templates is not None else DEFAULT_TEMPLATES).items():
+            self._sources.setdefault(_normalize_locale(locale), {}).update(entries)
+        if directory is not None:
+            self._load_directory(Path(directory))
+        self._compiled: dict[tuple[str, Optional[str]], CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, locale: Optional[str] = None) -> CompiledTemplate:
+        key = (name, locale)
+        template = self._compiled.get(key)
+        if template is not None:
+            return template
+        with self._lock:
+            template = self._compiled.get(key)
+            if template is None:
+                template = self._compile(name, locale)
+                self._compiled[key] = template
+        return template
+
+    def render(self, name: str, locale: Optional[str], values: Mapping[str, Any]) -> str:
+        return self.get(name, locale).render(values)
+
+    def locales(self) -> list[str]:
+        return sorted(self._sources)
+
+    def _compile(self, name: str, locale: Optional[str]) -> CompiledTemplate:
+        for candidate in self._fallbacks(locale):
+            source = self._sources.get(candidate, {}).get(name)
+            if source is not None:
+                return CompiledTemplate(name, candidate, source)
+        raise TemplateError(f"No template {name!r} for locale {locale or self.default_locale!r}")
+
+    def _fallbacks(self, locale: Optional[str]) -> list[str]:
+        candidates = []
+        if locale:
+            locale = _normalize_locale(locale)
+            candidates.append(locale)
+            language = locale.split("-")[0]
+            if language != locale:
+                candidates.append(language)
+        if self.default_locale not in candidates:
+            candidates.append(self.default_locale)
+        return candidates
+
+    def _load_directory(self, directory: Path):
+        for path in sorted(directory.glob("*.json")):
+            with path.open(encoding="utf-8") as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict) or not all(isinstance(v, str) for v in entries.values()):
+                raise TemplateError(f"{path} must map template names to strings")
+            self._sources.setdefault(_normalize_locale(path.stem), {}).update(entries)
+
+
+def _normalize_locale(locale: str) -> str:
+    # 'pt_BR', 'PT-br' -> 'pt-BR'
+    language, _, region = locale.replace("_", "-").partition("-")
+    return f"{language.lower()}-{region.upper()}" if region else language.lower()
+
+
+_default_catalog: Optional[TemplateCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def default_catalog() -> TemplateCatalog:
+    """The process-wide catalog of built-in templates, shared so compiled templates are reused."""
+    global _default_catalog
+    if _default_catalog is None:
+        with _default_catalog_lock:
+            if _default_catalog is None:
+                _default_catalog = TemplateCatalog()
+    return _default_catalog
+
+
+def receipt_fields(customer_data, payment_data, transaction_id: str) -> dict[str, Any]:
+    return {
+        "name": customer_data.name,
+        "amount": payment_data.amount,
+        "currency": payment_data.currency,
+        "transaction_id": transaction_id,
+    }
+
+
+def digest_fields(
+    catalog: TemplateCatalog,
+    customer_data,
+    notifications: Sequence[tuple[Any, str]],
+) -> dict[str, Any]:
+    """Fields for the digest templates: one rendered 'digest.line' per payment and totals per currency."""
+    line = catalog.get("digest.line", customer_data.locale)
+    totals: dict[str, int] = {}
+    lines = []
+    for payment_data, transaction_id in notifications:
+        lines.append(line.render(receipt_fields(customer_data, payment_data, transaction_id)))
+        totals[payment_data.currency] = totals.get(payment_data.currency, 0) + payment_data.amount
+    return {
+        "name": customer_data.name,
+        "count": len(notifications),
+        "lines": "\n".join(lines),
+        "totals": ", ".join(f"{currency} {amount}" for currency, amount in totals.items()),
+        "transaction_id": notifications[-1][1],
+    }
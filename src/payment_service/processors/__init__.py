@@ -1,13 +1,30 @@
 from .offline_processor import OfflinePaymentProcessor
+from .offline_ledger import OfflineLedger
 from .stripe_processor import StripePaymentProcessor
-from .payment import PaymentProcessorProtocol
-from .recurring import RecurringPaymentProcessorProtocol
-from .refunds import RefundProcessorProtocol
+from .stripe_client import StripeClientConfig
+from .payment import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol
+from .recurring import AsyncRecurringPaymentProcessorProtocol, RecurringPaymentProcessorProtocol
+from .refunds import AsyncRefundProcessorProtocol, RefundProcessorProtocol
+from .registry import ANY_CURRENCY, ProcessorRegistry, UnsupportedPaymentMethodError
+from .router import ProcessorRouter
+from .pending_queue import PendingChargeQueue
+from .store_and_forward import StoreAndForwardProcessor
 
 __all__ = [
     "PaymentProcessorProtocol",
+    "AsyncPaymentProcessorProtocol",
     "StripePaymentProcessor",
+    "StripeClientConfig",
     "OfflinePaymentProcessor",
+    "OfflineLedger",
     "RecurringPaymentProcessorProtocol",
-    "RefundProcessorProtocol"
-]
\ No newline at end of file
+    "AsyncRecurringPaymentProcessorProtocol",
+    "RefundProcessorProtocol",
+    "AsyncRefundProcessorProtocol",
+    "ProcessorRouter",
+    "PendingChargeQueue",
+    "StoreAndForwardProcessor",
+    "ProcessorRegistry",
+    "UnsupportedPaymentMethodError",
+    "ANY_CURRENCY",
+]
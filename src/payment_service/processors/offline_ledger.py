@@ -0,0 +1,112 @@
+import csv
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timezone
+from typing import IO, Iterator
+from payment_service.commons import CustomerData, PaymentData
+
+# Fixed-width settlement layout: (column, width). Text is left-aligned, amounts right-aligned with zeros.
+FIXED_WIDTH_LAYOUT = (
+    ("transaction_id", 40),
+    ("created_at", 25),
+    ("customer_name", 40),
+    ("customer_id", 24),
+    ("amount", 12),
+    ("currency", 3),
+    ("source", 32),
+)
+_COLUMNS = [column for column, _ in FIXED_WIDTH_LAYOUT]
+
+
+class OfflineLedger:
+    """Append-only SQLite ledger of offline payments, indexed by settlement day (UTC)."""
+
+    def __init__(self, path: str = "offline_payments.db", fetch_size: int = 1000):
+        self.path = path
+        self.fetch_size = fetch_size
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS offline_payments (
+                    transaction_id TEXT PRIMARY KEY,
+                    settlement_date TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    customer_name TEXT NOT NULL,
+                    customer_id TEXT,
+                    amount INTEGER NOT NULL,
+                    currency TEXT NOT NULL,
+                    source TEXT NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS offline_payments_day ON offline_payments (settlement_date)"
+            )
+
+    def record(self, customer_data: CustomerData, payment_data: PaymentData) -> str:
+        now = datetime.now(timezone.utc)
+        transaction_id = f"off_{now:%Y%m%d}_{uuid.uuid4().hex[:20]}"
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO offline_payments VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    transaction_id,
+                    now.date().isoformat(),
+                    now.isoformat(timespec="seconds"),
+                    customer_data.name,
+                    customer_data.customer_id,
+                    payment_data.amount,
+                    payment_data.currency.upper(),
+                    payment_data.source,
+                ),
+            )
+        return transaction_id
+
+    def iter_day(self, day: date) -> Iterator[tuple]:
+        """Stream the day's payments in recording order, 'fetch_size' rows at a time."""
+        # A separate connection so a long export never holds the lock writers need.
+        connection = sqlite3.connect(self.path)
+        try:
+            cursor = connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM offline_payments WHERE settlement_date = ? ORDER BY rowid",
+                (day.isoformat(),),
+            )
+            while rows := cursor.fetchmany(self.fetch_size):
+                yield from rows
+        finally:
+            connection.close()
+
+    def export_settlement(self, day: date, output: IO[str], file_format: str = "csv") -> int:
+        """Write the day's payments to 'output' as CSV or fixed-width and return the row count."""
+        rows = self.iter_day(day)
+        count = 0
+        if file_format == "csv":
+            writer = csv.writer(output)
+            writer.writerow(_COLUMNS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        elif file_format == "fixed":
+            for row in rows:
+                output.write(_fixed_width_line(row))
+                count += 1
+        else:
+            raise ValueError(f"Unsupported settlement format: {file_format}")
+        return count
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _fixed_width_line(row: tuple) -> str:
+    fields = []
+    for (column, width), value in zip(FIXED_WIDTH_LAYOUT, row):
+        if column == "amount":
+            fields.append(str(value).rjust(width, "0")[-width:])
+        else:
+            fields.append(("" if value is None else str(value)).ljust(width)[:width])
+    return "".join(fields) + "\n"
@@ -1,12 +1,22 @@
+from dataclasses import dataclass
+from typing import Optional
 from .payment import PaymentProcessorProtocol
+from .offline_ledger import OfflineLedger
 from payment_service.commons import CustomerData, PaymentData, PaymentResponse
 
+@dataclass
 class OfflinePaymentProcessor(PaymentProcessorProtocol):
+    # With a ledger, every offline payment is appended to it, which also produces the settlement file.
+    # Without one nothing is persisted and no transaction id is issued, as before.
+    ledger: Optional[OfflineLedger] = None
+
     def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
         print("Processing offline payment for", customer_data.name)
+        transaction_id = self.ledger.record(customer_data, payment_data) if self.ledger is not None else None
         return PaymentResponse(
             status="success",
             amount=payment_data.amount,
-            transaction_id=None,
-            message="Offline payment success"
-        )
\ No newline at end of file
+            transaction_id=transaction_id,
+            message="Offline payment success",
+            processor=type(self).__name__,
+        )
@@ -1,4 +1,4 @@
-from typing import Protocol
+from typing import Protocol, runtime_checkable
 from payment_service.commons import CustomerData, PaymentData, PaymentResponse
 
 class PaymentProcessorProtocol(Protocol):
@@ -8,4 +8,13 @@ class PaymentProcessorProtocol(Protocol):
     Should provide methods for processing payments.
     """ 
     def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        ...
+
+@runtime_checkable
+class AsyncPaymentProcessorProtocol(Protocol):
+    """Protocol for processing payments without blocking the event loop.
+
+    Implementations await the provider call instead of holding a thread for it.
+    """
+    async def process_transaction_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
         ...
\ No newline at end of file
@@ -0,0 +1,124 @@
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse
+
+
+class PendingChargeQueue:
+    """Durable SQLite queue of charges accepted while the online processor was unavailable.
+
+    Rows move pending -> in_flight (claimed by a drain) -> done/failed, or back to pending
+    when the upstream is still down. Claimed rows left in_flight by a crashed process are
+    returned to pending when the queue is opened again.
+
+    A charge is queued once per idempotency key: enqueueing a key that already has a
+    row which has not failed returns that row's reference instead of adding a second one.
+    """
+
+    def __init__(self, path: str = "pending_charges.db"):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS pending_charges (
+                    reference_id TEXT PRIMARY KEY,
+                    customer TEXT NOT NULL,
+                    payment TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    transaction_id TEXT,
+                    message TEXT,
+                    idempotency_key TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(pending_charges)")}
+            if "idempotency_key" not in columns:
+                # Queues created before keys were stored; their rows simply have none.
+                self._connection.execute("ALTER TABLE pending_charges ADD COLUMN idempotency_key TEXT")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS pending_charges_status ON pending_charges (status, created_at)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS pending_charges_key ON pending_charges (idempotency_key)"
+            )
+            self._connection.execute("UPDATE pending_charges SET status = 'pending' WHERE status = 'in_flight'")
+
+    def enqueue(self, customer_data: CustomerData, payment_data: PaymentData) -> str:
+        """Queue the charge and return its reference_id, or the existing one for the same idempotency key."""
+        reference_id = f"pend_{uuid.uuid4().hex}"
+        key = payment_data.idempotency_key
+        now = time.time()
+        with self._lock, self._connection:
+            if key:
+                existing = self._connection.execute(
+                    "SELECT reference_id FROM pending_charges WHERE idempotency_key = ? AND status != 'failed' "
+                    "ORDER BY created_at LIMIT 1",
+                    (key,),
+                ).fetchone()
+                if existing is not None:
+                    return existing[0]
+            self._connection.execute(
+                "INSERT INTO pending_charges "
+                "(reference_id, customer, payment, status, idempotency_key, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (reference_id, customer_data.model_dump_json(), payment_data.model_dump_json(), key, now, now),
+            )
+        return reference_id
+
+    def claim(self, limit: int) -> list[tuple[str, CustomerData, PaymentData]]:
+        """Mark up to 'limit' of the oldest pending charges in_flight and return them."""
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT reference_id, customer, payment FROM pending_charges "
+                "WHERE status = 'pending' ORDER BY created_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+            self._connection.executemany(
+                "UPDATE pending_charges SET status = 'in_flight', attempts = attempts + 1, updated_at = ? "
+                "WHERE reference_id = ?",
+                [(time.time(), reference_id) for reference_id, _, _ in rows],
+            )
+        return [
+            (reference_id, CustomerData.model_validate_json(customer), PaymentData.model_validate_json(payment))
+            for reference_id, customer, payment in rows
+        ]
+
+    def complete(self, reference_id: str, response: PaymentResponse):
+        status = "failed" if response.status == "failed" else "done"
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE pending_charges SET status = ?, transaction_id = ?, message = ?, updated_at = ? "
+                "WHERE reference_id = ?",
+                (status, response.transaction_id, response.message, time.time(), reference_id),
+            )
+
+    def release(self, reference_ids: list[str]):
+        """Put claimed charges back to pending for a later drain."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE pending_charges SET status = 'pending', updated_at = ? WHERE reference_id = ?",
+                [(time.time(), reference_id) for reference_id in reference_ids],
+            )
+
+    def status(self, reference_id: str) -> Optional[tuple[str, Optional[str]]]:
+        """(status, transaction_id) of a queued charge, or None if the reference is unknown."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT status, transaction_id FROM pending_charges WHERE reference_id = ?", (reference_id,)
+            ).fetchone()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM pending_charges WHERE status IN ('pending', 'in_flight')"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
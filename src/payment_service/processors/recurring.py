@@ -1,8 +1,16 @@
-from typing import Protocol
+from typing import Protocol, runtime_checkable
 from payment_service.commons import CustomerData, PaymentData, PaymentResponse
 
 class RecurringPaymentProcessorProtocol(Protocol):
     """Protocol for setting up recurring payments."""
 
     def setup_recurring_payment(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        ...
+
+
+@runtime_checkable
+class AsyncRecurringPaymentProcessorProtocol(Protocol):
+    """Protocol for setting up recurring payments without blocking the event loop."""
+
+    async def setup_recurring_payment_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
         ...
\ No newline at end of file
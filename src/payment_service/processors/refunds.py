@@ -1,8 +1,16 @@
-from typing_extensions import Protocol
+from typing_extensions import Protocol, runtime_checkable
 from payment_service.commons import PaymentResponse
 
 class RefundProcessorProtocol(Protocol):
     """Protocol for processing refunds."""
 
     def refund_payment(self, transaction_id: str) -> PaymentResponse:
+        ...
+
+
+@runtime_checkable
+class AsyncRefundProcessorProtocol(Protocol):
+    """Protocol for processing refunds without blocking the event loop."""
+
+    async def refund_payment_async(self, transaction_id: str) -> PaymentResponse:
         ...
\ No newline at end of file
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Iterable
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse, PaymentType
+from .payment import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol
+
+ANY_CURRENCY = "*"
+
+
+class UnsupportedPaymentMethodError(ValueError):
+    """Raised when no processor is registered for a payment's (type, currency)."""
+
+    def __init__(self, payment_type: PaymentType, currency: str):
+        self.payment_type = payment_type
+        self.currency = currency
+        super().__init__(f"Unsupported payment method: {payment_type.value} payments in {currency}")
+
+
+class ProcessorRegistry(PaymentProcessorProtocol, AsyncPaymentProcessorProtocol):
+    """Maps (PaymentType, currency) to a shared, long-lived processor instance.
+
+    Processors register the pairs they support, using ANY_CURRENCY as a fallback for a
+    type. Lookup is one or two dict probes. The registry is itself a payment processor, so
+    a single PaymentService can serve every registered pair.
+    """
+
+    def __init__(self):
+        self._processors: dict[tuple[PaymentType, str], Any] = {}
+
+    def register(
+        self,
+        processor: Any,
+        payment_types: Iterable[PaymentType],
+        currencies: Iterable[str] = (ANY_CURRENCY,),
+    ):
+        currencies = list(currencies)
+        for payment_type in payment_types:
+            for currency in currencies:
+                self._processors[(payment_type, currency.upper())] = processor
+
+    def get(self, payment_data: PaymentData) -> PaymentProcessorProtocol:
+        currency = payment_data.currency.upper()
+        processor = self._processors.get((payment_data.type, currency))
+        if processor is None:
+            processor = self._processors.get((payment_data.type, ANY_CURRENCY))
+            if processor is None:
+                raise UnsupportedPaymentMethodError(payment_data.type, currency)
+        return processor
+
+    def supported(self) -> list[tuple[PaymentType, str]]:
+        return list(self._processors)
+
+    def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        return self.get(payment_data).process_transaction(customer_data, payment_data)
+
+    async def process_transaction_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        processor = self.get(payment_data)
+        if isinstance(processor, AsyncPaymentProcessorProtocol):
+            return await processor.process_transaction_async(customer_data, payment_data)
+        return await asyncio.to_thread(processor.process_transaction, customer_data, payment_data)
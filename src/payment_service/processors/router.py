@@ -0,0 +1,186 @@
+import asyncio
+import math
+import time
+from typing import Any, Iterable, Optional
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse, PaymentType
+from payment_service.resilience.retry import is_unprocessed_error
+from .payment import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol
+
+
+class _Route:
+    """A registered processor and its rolling health stats (exponentially weighted)."""
+    __slots__ = ("name", "processor", "latency", "error_rate", "samples")
+
+    def __init__(self, name: str, processor: Any):
+        self.name = name
+        self.processor = processor
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.samples = 0
+
+    @property
+    def available(self) -> bool:
+        # Processors wrapped in ResilientProcessor expose their breaker through 'available'.
+        return getattr(self.processor, "available", True)
+
+
+class ProcessorRouter(PaymentProcessorProtocol, AsyncPaymentProcessorProtocol):
+    """Sends each payment to the healthiest, fastest processor registered for its (type, currency).
+
+    Score = latency EWMA * (1 + error_penalty * error-rate EWMA); processors without samples
+    score 0 so new ones get traffic, and every 'probe_every'-th decision goes to the next
+    candidate in rotation so a slower route's stats stay fresh. Picking a route is a dict
+    lookup plus a scan of the few candidates for that pair, with no allocation.
+
+    The router fails over to the next candidate only when the provider certainly did not
+    take the payment: an open breaker, a 429 or a failed connect (PaymentResponse.not_processed,
+    or an exception for which is_unprocessed_error holds). Ambiguous failures such as read
+    timeouts are returned (or raised) as they are, since the charge may already exist there.
+    """
+
+    def __init__(self, smoothing: float = 0.2, error_penalty: float = 10.0, probe_every: int = 100):
+        self.smoothing = smoothing
+        self.error_penalty = error_penalty
+        self.probe_every = probe_every
+        self._routes: dict[tuple[PaymentType, str], list[_Route]] = {}
+        self._decisions = 0
+
+    def register(
+        self,
+        name: str,
+        processor: Any,
+        payment_types: Iterable[PaymentType] = (PaymentType.ONLINE,),
+        currencies: Iterable[str] = ("USD",),
+    ):
+        route = _Route(name, processor)
+        currencies = [currency.upper() for currency in currencies]
+        for payment_type in payment_types:
+            for currency in currencies:
+                self._routes.setdefault((payment_type, currency), []).append(route)
+
+    def supports(self, payment_data: PaymentData) -> bool:
+        return (payment_data.type, payment_data.currency.upper()) in self._routes
+
+    def pairs(self) -> list[tuple[PaymentType, str]]:
+        return list(self._routes)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        seen = {route.name: route for routes in self._routes.values() for route in routes}
+        return {
+            name: {"latency": route.latency, "error_rate": route.error_rate, "samples": route.samples}
+            for name, route in seen.items()
+        }
+
+    def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        routes = self._routes.get((payment_data.type, payment_data.currency.upper()))
+        if not routes:
+            return self._no_route_response(payment_data)
+        route, tried, response = self._pick(routes), None, None
+        while route is not None:
+            started = time.perf_counter()
+            try:
+                response = route.processor.process_transaction(customer_data, payment_data)
+            except Exception as e:
+                self._record(route, started, failed=True)
+                if not is_unprocessed_error(e):
+                    raise
+                print(f"Processor {route.name} unreachable, failing over:", e)
+                response = self._unreachable_response(payment_data, e)
+                response.processor = route.name
+            else:
+                self._record(route, started, failed=response.retryable)
+                response.processor = route.name
+                if not response.not_processed:
+                    return response
+                print(f"Processor {route.name} did not take the payment, failing over:", response.message)
+            tried = (tried or []) + [route]
+            route = self._failover(routes, tried)
+        return response
+
+    async def process_transaction_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        routes = self._routes.get((payment_data.type, payment_data.currency.upper()))
+        if not routes:
+            return self._no_route_response(payment_data)
+        route, tried, response = self._pick(routes), None, None
+        while route is not None:
+            started = time.perf_counter()
+            try:
+                if isinstance(route.processor, AsyncPaymentProcessorProtocol):
+                    response = await route.processor.process_transaction_async(customer_data, payment_data)
+                else:
+                    response = await asyncio.to_thread(route.processor.process_transaction, customer_data, payment_data)
+            except Exception as e:
+                self._record(route, started, failed=True)
+                if not is_unprocessed_error(e):
+                    raise
+                print(f"Processor {route.name} unreachable, failing over:", e)
+                response = self._unreachable_response(payment_data, e)
+                response.processor = route.name
+            else:
+                self._record(route, started, failed=response.retryable)
+                response.processor = route.name
+                if not response.not_processed:
+                    return response
+                print(f"Processor {route.name} did not take the payment, failing over:", response.message)
+            tried = (tried or []) + [route]
+            route = self._failover(routes, tried)
+        return response
+
+    def _pick(self, routes: list[_Route]) -> _Route:
+        # Hot path: no allocation beyond the float arithmetic.
+        self._decisions += 1
+        if self.probe_every and self._decisions % self.probe_every == 0:
+            probe = routes[(self._decisions // self.probe_every) % len(routes)]
+            if probe.available:
+                return probe
+        best, best_score = None, math.inf
+        for route in routes:
+            if not route.available:
+                continue
+            score = self._score(route)
+            if score < best_score:
+                best, best_score = route, score
+        # Every breaker open: try the first route anyway, it fails fast and the rest follow.
+        return best if best is not None else routes[0]
+
+    def _failover(self, routes: list[_Route], tried: list[_Route]) -> Optional[_Route]:
+        # Only reached after a provider certainly did not take the payment; available routes first.
+        best, best_key = None, None
+        for route in routes:
+            if route in tried:
+                continue
+            key = (not route.available, self._score(route))
+            if best_key is None or key < best_key:
+                best, best_key = route, key
+        return best
+
+    def _score(self, route: _Route) -> float:
+        return route.latency * (1.0 + self.error_penalty * route.error_rate)
+
+    def _record(self, route: _Route, started: float, failed: bool):
+        # Plain float updates; a lost update under contention only nudges an average.
+        elapsed = time.perf_counter() - started
+        alpha = 1.0 if route.samples == 0 else self.smoothing
+        route.latency += alpha * (elapsed - route.latency)
+        route.error_rate += alpha * ((1.0 if failed else 0.0) - route.error_rate)
+        route.samples += 1
+
+    @staticmethod
+    def _unreachable_response(payment_data: PaymentData, error: Exception) -> PaymentResponse:
+        return PaymentResponse(
+            status="failed",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message=str(error),
+            retryable=True,
+            not_processed=True,
+        )
+
+    @staticmethod
+    def _no_route_response(payment_data: PaymentData) -> PaymentResponse:
+        return PaymentResponse(
+            status="failed",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message=f"No processor registered for {payment_data.type.value} payments in {payment_data.currency}",
+        )
@@ -0,0 +1,106 @@
+import threading
+from typing import Any, Callable, Optional
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse
+from payment_service.idempotency import charge_idempotency_key
+from payment_service.resilience.retry import is_retryable_error
+from .payment import PaymentProcessorProtocol
+from .pending_queue import PendingChargeQueue
+
+SettledCallback = Callable[[str, CustomerData, PaymentData, PaymentResponse], None]
+
+
+class StoreAndForwardProcessor(PaymentProcessorProtocol):
+    """Accepts charges into a durable queue while the wrapped processor is unavailable.
+
+    When the processor's breaker is open ('available' is False) or it fails with a
+    retryable error, the charge is queued and a 'pending' response carrying a local
+    reference_id is returned straight away. A drain replays the queue in batches of
+    'drain_batch_size' once the upstream recovers, each with the idempotency key fixed at
+    enqueue time, and stops at the first retryable failure.
+    """
+
+    def __init__(
+        self,
+        processor: Any,
+        queue: PendingChargeQueue,
+        drain_batch_size: int = 100,
+        drain_interval: float = 5.0,
+        on_settled: Optional[SettledCallback] = None,
+    ):
+        self.processor = processor
+        self.queue = queue
+        self.drain_batch_size = drain_batch_size
+        self.drain_interval = drain_interval
+        self.on_settled = on_settled
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        if getattr(self.processor, "available", True):
+            try:
+                response = self.processor.process_transaction(customer_data, payment_data)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                print("Payment provider error, queueing charge:", e)
+            else:
+                if not response.retryable:
+                    return response
+                print("Payment provider unavailable, queueing charge:", response.message)
+        return self._enqueue(customer_data, payment_data)
+
+    def drain(self) -> int:
+        """Replay one batch of queued charges and return how many were settled."""
+        claimed = self.queue.claim(self.drain_batch_size)
+        for position, (reference_id, customer_data, payment_data) in enumerate(claimed):
+            try:
+                response = self.processor.process_transaction(customer_data, payment_data)
+            except Exception as e:
+                if is_retryable_error(e):
+                    self.queue.release([reference for reference, _, _ in claimed[position:]])
+                    return position
+                response = PaymentResponse(status="failed", amount=payment_data.amount, message=str(e))
+            if response.retryable:
+                self.queue.release([reference for reference, _, _ in claimed[position:]])
+                return position
+            self.queue.complete(reference_id, response)
+            if self.on_settled is not None:
+                try:
+                    self.on_settled(reference_id, customer_data, payment_data, response)
+                except Exception as e:
+                    # The charge is settled either way; a failing callback must not stall the drain.
+                    print("Settlement callback failed for", reference_id, e)
+        return len(claimed)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="store-and-forward", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Keep draining full batches back to back; wait when the queue is empty or upstream is down.
+            if not getattr(self.processor, "available", True) or self.drain() < self.drain_batch_size:
+                self._stop.wait(self.drain_interval)
+
+    def _enqueue(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        if not payment_data.idempotency_key:
+            payment_data = payment_data.model_copy(
+                update={"idempotency_key": charge_idempotency_key(customer_data, payment_data)}
+            )
+        reference_id = self.queue.enqueue(customer_data, payment_data)
+        return PaymentResponse(
+            status="pending",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message="Payment accepted and queued for processing",
+            reference_id=reference_id,
+        )
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import ssl
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Optional
+import httpx
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from payment_service.commons import current_deadline
+
+# Floor for a timeout derived from an almost exhausted deadline, so requests never gets 0.
+_MIN_TIMEOUT = 0.001
+
+
+@dataclass
+class StripeClientConfig:
+    """Connection settings for a long-lived StripeClient.
+
+    'api_key' falls back to the STRIPE_API_KEY environment variable, read once when the
+    processor is built. 'api_base' (or STRIPE_API_BASE) redirects calls, e.g. to the local
+    fake server in payment_service.fakes. 'pool_size' caps the keep-alive connections held
+    per transport.
+    """
+    api_key: Optional[str] = field(default=None, repr=False)
+    api_base: Optional[str] = None
+    pool_size: int = 10
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_network_retries: Optional[int] = None
+
+    def resolve_api_key(self) -> Optional[str]:
+        return self.api_key or os.getenv("STRIPE_API_KEY")
+
+    def resolve_api_base(self) -> Optional[str]:
+        return self.api_base or os.getenv("STRIPE_API_BASE")
+
+
+class _PooledHTTPX:
+    """The httpx module as seen by HTTPXClient, with pool limits applied to every AsyncClient it builds."""
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+
+    def __getattr__(self, name: str):
+        return getattr(httpx, name)
+
+    def AsyncClient(self, **kwargs) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self.limits, **kwargs)
+
+
+class _PooledHTTPXClient(stripe.HTTPXClient):
+    """stripe's httpx transport with an explicit connection pool size and one AsyncClient per event loop.
+
+    An httpx.AsyncClient's connections belong to the loop that opened them, so a single
+    shared client breaks once a second loop (another thread, or a later asyncio.run) uses it.
+    """
+
+    def __init__(self, pool_size: int, timeout: httpx.Timeout):
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._loop_clients_lock = threading.Lock()
+        self._unbound: list[httpx.AsyncClient] = []
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # The base class builds its AsyncClient through '_lib'; it becomes the first loop's client.
+        super().__init__(timeout=timeout, _lib=_PooledHTTPX(limits))
+
+    @property
+    def _client_async(self) -> httpx.AsyncClient:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._loop_clients_lock:
+            if loop is None:
+                # Outside a loop (e.g. build_request for a sync stream) any client will do.
+                return self._unbound[0] if self._unbound else next(iter(self._loop_clients.values()))
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = self._unbound.pop() if self._unbound else self._new_async_client()
+                self._loop_clients[loop] = client
+            return client
+
+    @_client_async.setter
+    def _client_async(self, client: httpx.AsyncClient):
+        self._unbound.append(client)
+
+    def _new_async_client(self) -> httpx.AsyncClient:
+        verify = ssl.create_default_context(cafile=stripe.ca_bundle_path) if self._verify_ssl_certs else False
+        return self.httpx.AsyncClient(verify=verify)
+
+
+class _DeadlineRequestsClient(stripe.RequestsClient):
+    """stripe's requests transport, with timeouts capped by the caller's current deadline."""
+
+    @property
+    def _timeout(self):
+        deadline = current_deadline()
+        if deadline is None:
+            return self._default_timeout
+        remaining = max(deadline.remaining(), _MIN_TIMEOUT)
+        connect_timeout, read_timeout = self._default_timeout
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+    @_timeout.setter
+    def _timeout(self, value):
+        self._default_timeout = value
+
+
+def build_stripe_client(api_key: str, config: StripeClientConfig) -> stripe.StripeClient:
+    """Build a thread-safe StripeClient whose sync and async transports reuse TLS connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    async_client = _PooledHTTPXClient(
+        pool_size=config.pool_size,
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+    )
+    http_client = _DeadlineRequestsClient(
+        timeout=(config.connect_timeout, config.read_timeout),
+        session=session,
+        async_fallback_client=async_client,
+    )
+    api_base = config.resolve_api_base()
+    return stripe.StripeClient(
+        api_key,
+        base_addresses={"api": api_base} if api_base else None,
+        http_client=http_client,
+        max_network_retries=config.max_network_retries,
+    )
@@ -1,62 +1,291 @@
-import os
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
 import stripe
 from dotenv import load_dotenv
-from stripe import StripeError 
-from payment_service.commons import CustomerData, PaymentData, PaymentResponse
-from .payment import PaymentProcessorProtocol
-from .recurring import RecurringPaymentProcessorProtocol
-from .refunds import RefundProcessorProtocol
+from stripe import AuthenticationError, InvalidRequestError, RateLimitError, StripeError
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse, current_deadline
+from payment_service.idempotency import charge_idempotency_key, recurring_setup_idempotency_key, refund_idempotency_key
+from payment_service.resilience.rate_limit import AdaptiveRateLimiter
+from payment_service.resilience.retry import is_retryable_error, is_unprocessed_error
+from .payment import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol
+from .recurring import AsyncRecurringPaymentProcessorProtocol, RecurringPaymentProcessorProtocol
+from .refunds import AsyncRefundProcessorProtocol, RefundProcessorProtocol
+from .stripe_client import StripeClientConfig, build_stripe_client
 
 _ = load_dotenv()
 
-class StripePaymentProcessor(PaymentProcessorProtocol, RefundProcessorProtocol, RecurringPaymentProcessorProtocol):
+_THROTTLED = "Not sent: no rate limit token before the deadline"
+
+
+def _remaining() -> Optional[float]:
+    deadline = current_deadline()
+    return None if deadline is None else deadline.remaining()
+
+
+@dataclass
+class StripePaymentProcessor(
+    PaymentProcessorProtocol,
+    RefundProcessorProtocol,
+    RecurringPaymentProcessorProtocol,
+    AsyncPaymentProcessorProtocol,
+    AsyncRefundProcessorProtocol,
+    AsyncRecurringPaymentProcessorProtocol,
+):
+    # One client per processor: API key resolved once, HTTP connections pooled and reused.
+    config: StripeClientConfig = field(default_factory=StripeClientConfig)
+    # Optional client-side throttle shared by every outbound call (and every thread/task using this processor).
+    rate_limiter: Optional[AdaptiveRateLimiter] = None
+    _client: Optional[stripe.StripeClient] = field(init=False, default=None, repr=False)
+
+    def __post_init__(self):
+        api_key = self.config.resolve_api_key()
+        if api_key:
+            self._client = build_stripe_client(api_key, self.config)
+
+    @property
+    def client(self) -> stripe.StripeClient:
+        if self._client is None:
+            raise AuthenticationError("No API key provided. Set STRIPE_API_KEY or StripeClientConfig.api_key.")
+        return self._client
+
     def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
-        stripe.api_key = os.getenv("STRIPE_API_KEY") 
         # Payment processing responsibility
+        if not self._acquire_write():
+            return self._charge_throttled(payment_data)
         try:
-            charge = stripe.Charge.create(
-                amount=payment_data.amount,
-                currency=payment_data.currency,
-                source=payment_data.source,
-                description="Charge for " + customer_data.name,
-            )
-            print("Payment successful.")
-            print("Transaction_ID:", charge["id"])
-            return PaymentResponse(
-                status=charge["status"],
-                amount=charge["amount"],
-                transaction_id=charge["id"],
-                message="Payment successful",
+            charge = self.client.v1.charges.create(
+                params=self._charge_params(customer_data, payment_data),
+                options={"idempotency_key": charge_idempotency_key(customer_data, payment_data)},
             )
+            self._record_outcome(None)
+            return self._charge_succeeded(charge)
         except StripeError as e:
-            print("Payment failed:", e)
-            return PaymentResponse(
-                status="failed",
-                amount=payment_data.amount,
-                transaction_id=None,
-                message=str(e),
-            )
+            self._record_outcome(e)
+            return self._charge_failed(payment_data, e)
+
+    async def process_transaction_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        # Same charge as process_transaction, awaited on the non-blocking (httpx) client
+        if not await self._acquire_write_async():
+            return self._charge_throttled(payment_data)
+        try:
+            charge = await self._within_deadline(self.client.v1.charges.create_async(
+                params=self._charge_params(customer_data, payment_data),
+                options={"idempotency_key": charge_idempotency_key(customer_data, payment_data)},
+            ))
+            self._record_outcome(None)
+            return self._charge_succeeded(charge)
+        except StripeError as e:
+            self._record_outcome(e)
+            return self._charge_failed(payment_data, e)
+        except asyncio.TimeoutError:
+            return self._charge_timed_out(payment_data)
+
     def refund_payment(self, transaction_id: str) -> PaymentResponse:
-        stripe.api_key = os.getenv("STRIPE_API_KEY") 
         # Refund processing responsibility
+        if not self._acquire_write():
+            return self._refund_failed(TimeoutError(_THROTTLED))
         try:
-            refund = stripe.Refund.create(
-                charge=transaction_id,
+            refund = self.client.v1.refunds.create(
+                params={"charge": transaction_id},
+                options={"idempotency_key": refund_idempotency_key(transaction_id)},
             )
-            print("Refund successful")
-            return PaymentResponse(
-                status=refund["status"],
-                amount=refund["amount"],
-                transaction_id=refund["id"],
-                message="Refund successful",
+            self._record_outcome(None)
+            return self._refund_succeeded(refund)
+        except StripeError as e:
+            self._record_outcome(e)
+            return self._refund_failed(e)
+
+    async def refund_payment_async(self, transaction_id: str) -> PaymentResponse:
+        if not await self._acquire_write_async():
+            return self._refund_failed(TimeoutError(_THROTTLED))
+        try:
+            refund = await self._within_deadline(self.client.v1.refunds.create_async(
+                params={"charge": transaction_id},
+                options={"idempotency_key": refund_idempotency_key(transaction_id)},
+            ))
+            self._record_outcome(None)
+            return self._refund_succeeded(refund)
+        except StripeError as e:
+            self._record_outcome(e)
+            return self._refund_failed(e)
+        except asyncio.TimeoutError:
+            return self._refund_failed(TimeoutError("Refund timed out: deadline exceeded"))
+
+    def setup_recurring_payment(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        # Saves the card on a Stripe customer; later charges bill that customer id.
+        print("Creating recurring payment for", customer_data.name)
+        if not self._acquire_write():
+            return self._charge_throttled(payment_data)
+        try:
+            customer = self.client.v1.customers.create(
+                params=self._customer_params(customer_data, payment_data),
+                options={"idempotency_key": recurring_setup_idempotency_key(customer_data, payment_data)},
             )
+            self._record_outcome(None)
+            return self._recurring_set_up(customer, payment_data)
+        except StripeError as e:
+            self._record_outcome(e)
+            return self._charge_failed(payment_data, e)
+
+    async def setup_recurring_payment_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        print("Creating recurring payment for", customer_data.name)
+        if not await self._acquire_write_async():
+            return self._charge_throttled(payment_data)
+        try:
+            customer = await self._within_deadline(self.client.v1.customers.create_async(
+                params=self._customer_params(customer_data, payment_data),
+                options={"idempotency_key": recurring_setup_idempotency_key(customer_data, payment_data)},
+            ))
+            self._record_outcome(None)
+            return self._recurring_set_up(customer, payment_data)
         except StripeError as e:
-            print("Refund failed:", e)
+            self._record_outcome(e)
+            return self._charge_failed(payment_data, e)
+        except asyncio.TimeoutError:
+            return self._charge_timed_out(payment_data)
+
+    def _acquire_write(self) -> bool:
+        # False when no token frees up before the current deadline; the call is then not sent.
+        if self.rate_limiter is None:
+            return True
+        return self.rate_limiter.acquire_write(timeout=_remaining())
+
+    async def _acquire_write_async(self) -> bool:
+        if self.rate_limiter is None:
+            return True
+        return await self.rate_limiter.acquire_write_async(timeout=_remaining())
+
+    @staticmethod
+    async def _within_deadline(call):
+        # Sync calls get their timeout from the deadline-aware transport; async calls are cancelled here.
+        deadline = current_deadline()
+        if deadline is None:
+            return await call
+        return await asyncio.wait_for(call, timeout=deadline.remaining())
+
+    def _record_outcome(self, error: Optional[StripeError]):
+        if self.rate_limiter is None:
+            return
+        if isinstance(error, RateLimitError):
+            self.rate_limiter.record_throttled()
+        else:
+            self.rate_limiter.record_success()
+
+    @staticmethod
+    def _charge_params(customer_data: CustomerData, payment_data: PaymentData) -> dict:
+        params = {
+            "amount": payment_data.amount,
+            "currency": payment_data.currency,
+            "description": "Charge for " + customer_data.name,
+        }
+        if customer_data.stripe_customer_id:
+            # Recurring charges bill the card saved on the customer by setup_recurring_payment.
+            params["customer"] = customer_data.stripe_customer_id
+        else:
+            params["source"] = payment_data.source
+        return params
+
+    @staticmethod
+    def _customer_params(customer_data: CustomerData, payment_data: PaymentData) -> dict:
+        params = {"name": customer_data.name, "source": payment_data.source}
+        if customer_data.contact_info.email:
+            params["email"] = customer_data.contact_info.email
+        if customer_data.contact_info.phone:
+            params["phone"] = customer_data.contact_info.phone
+        return params
+
+    @staticmethod
+    def _recurring_set_up(customer, payment_data: PaymentData) -> PaymentResponse:
+        print("Recurring payment set up for customer", customer["id"])
+        return PaymentResponse(
+            status="succeeded",
+            amount=payment_data.amount,
+            transaction_id=customer["id"],
+            message="Recurring payment set up",
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _charge_succeeded(charge) -> PaymentResponse:
+        print("Payment successful.")
+        print("Transaction_ID:", charge["id"])
+        return PaymentResponse(
+            status=charge["status"],
+            amount=charge["amount"],
+            transaction_id=charge["id"],
+            message="Payment successful",
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _charge_failed(payment_data: PaymentData, error: StripeError) -> PaymentResponse:
+        print("Payment failed:", error)
+        return PaymentResponse(
+            status="failed",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message=str(error),
+            retryable=is_retryable_error(error),
+            not_processed=is_unprocessed_error(error),
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _charge_timed_out(payment_data: PaymentData) -> PaymentResponse:
+        print("Payment failed: deadline exceeded")
+        return PaymentResponse(
+            status="failed",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message="Payment timed out: deadline exceeded",
+            retryable=True,
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _charge_throttled(payment_data: PaymentData) -> PaymentResponse:
+        print("Payment failed:", _THROTTLED)
+        return PaymentResponse(
+            status="failed",
+            amount=payment_data.amount,
+            transaction_id=None,
+            message=_THROTTLED,
+            retryable=True,
+            not_processed=True,
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _refund_succeeded(refund) -> PaymentResponse:
+        print("Refund successful")
+        return PaymentResponse(
+            status=refund["status"],
+            amount=refund["amount"],
+            transaction_id=refund["id"],
+            message="Refund successful",
+            currency=refund["currency"].upper(),
+            processor="StripePaymentProcessor",
+        )
+
+    @staticmethod
+    def _refund_failed(error: Exception) -> PaymentResponse:
+        if isinstance(error, InvalidRequestError) and error.code == "charge_already_refunded":
+            # A re-run after a partial failure: the money already went back, nothing to retry.
+            print("Refund already processed:", error)
             return PaymentResponse(
-                status="failed",
+                status="already_refunded",
                 amount=0,
                 transaction_id=None,
-                message=str(e),
+                message=str(error),
+                processor="StripePaymentProcessor",
             )
-    def setup_recurring_payment(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
-        print("Creating recurring payment for", customer_data.name)  
\ No newline at end of file
+        print("Refund failed:", error)
+        return PaymentResponse(
+            status="failed",
+            amount=0,
+            transaction_id=None,
+            message=str(error),
+            retryable=is_retryable_error(error),
+            processor="StripePaymentProcessor",
+        )
@@ -0,0 +1,4 @@
+from .scheduler import RecurringScheduler
+from .subscription import Subscription
+
+__all__ = ["RecurringScheduler", "Subscription"]
@@ -0,0 +1,196 @@
+import heapq
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from payment_service.batch import CheckpointStore
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse
+from .subscription import Subscription
+
+ResultCallback = Callable[[Subscription, PaymentResponse], None]
+
+
+class RecurringScheduler:
+    """Fires due subscription charges through a PaymentService on a worker pool.
+
+    Subscriptions sit in a min-heap keyed by due time, so finding the next due charge is
+    O(1) and each reschedule O(log n). Cancelling or rescheduling bumps the subscription's
+    generation instead of searching the heap; stale entries are dropped when popped.
+    At most 'max_in_flight' charges run at once; the dispatcher waits for a free slot.
+    With a 'checkpoint', periods already charged by a previous process are skipped.
+    """
+
+    def __init__(
+        self,
+        service,
+        max_workers: int = 8,
+        max_in_flight: Optional[int] = None,
+        on_result: Optional[ResultCallback] = None,
+        clock: Callable[[], float] = time.time,
+        checkpoint: Optional[CheckpointStore] = None,
+    ):
+        self.service = service
+        self.checkpoint = checkpoint
+        self.on_result = on_result
+        self.clock = clock
+        self._subscriptions: dict[str, Subscription] = {}
+        self._heap: list[tuple[float, int, int, str]] = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recurring")
+        self._slots = threading.BoundedSemaphore(max_in_flight or max_workers * 2)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def get(self, subscription_id: str) -> Optional[Subscription]:
+        return self._subscriptions.get(subscription_id)
+
+    def subscribe(
+        self,
+        customer_data: CustomerData,
+        payment_data: PaymentData,
+        interval: float,
+        start_at: Optional[float] = None,
+    ) -> Subscription:
+        """Set up the recurring payment with the service's recurring processor, then schedule it."""
+        response = self.service.create_recurring_payment(customer_data, payment_data)
+        if response is None or response.status == "failed":
+            raise ValueError(f"Could not set up recurring payment: {response.message if response else 'no response'}")
+        customer_data = customer_data.model_copy(update={"stripe_customer_id": response.transaction_id})
+        subscription = Subscription(
+            subscription_id=uuid.uuid4().hex,
+            customer_data=customer_data,
+            payment_data=payment_data,
+            interval=interval,
+            next_run_at=start_at if start_at is not None else self.clock() + interval,
+        )
+        self.add(subscription)
+        return subscription
+
+    def add(self, subscription: Subscription):
+        with self._condition:
+            self._subscriptions[subscription.subscription_id] = subscription
+            self._push(subscription)
+            self._condition.notify()
+
+    def reschedule(self, subscription_id: str, next_run_at: float):
+        with self._condition:
+            subscription = self._subscriptions[subscription_id]
+            subscription.next_run_at = next_run_at
+            subscription.generation += 1
+            self._push(subscription)
+            self._condition.notify()
+
+    def cancel(self, subscription_id: str) -> bool:
+        with self._condition:
+            subscription = self._subscriptions.pop(subscription_id, None)
+            if subscription is None:
+                return False
+            subscription.active = False
+            subscription.generation += 1
+            return True
+
+    def next_due(self) -> Optional[float]:
+        with self._condition:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """Dispatch every charge due at 'now' and return how many were dispatched."""
+        now = self.clock() if now is None else now
+        dispatched = 0
+        while True:
+            with self._condition:
+                due = self._pop_due(now)
+            if due is None:
+                return dispatched
+            self._dispatch(*due)
+            dispatched += 1
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="recurring-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=wait)
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    due = self._next_due_locked()
+                    delay = None if due is None else due - self.clock()
+                    if delay is not None and delay <= 0:
+                        break
+                    self._condition.wait(timeout=delay)
+                if not self._running:
+                    return
+            self.run_pending()
+
+    def _dispatch(self, subscription: Subscription, payment_data: PaymentData):
+        self._slots.acquire()
+        future = self._executor.submit(self._charge, subscription, payment_data)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _charge(self, subscription: Subscription, payment_data: PaymentData):
+        # The period's idempotency key doubles as its checkpoint key.
+        response = self.checkpoint.completed(payment_data.idempotency_key) if self.checkpoint is not None else None
+        if response is not None:
+            return
+        try:
+            response = self.service.process_transaction(subscription.customer_data, payment_data)
+        except Exception as e:
+            print("Recurring charge failed for subscription", subscription.subscription_id, e)
+            response = PaymentResponse(status="failed", amount=payment_data.amount, transaction_id=None, message=str(e))
+        if self.checkpoint is not None:
+            self.checkpoint.mark_done(payment_data.idempotency_key, response)
+        if self.on_result is not None:
+            self.on_result(subscription, response)
+
+    def _push(self, subscription: Subscription):
+        self._sequence += 1
+        heapq.heappush(
+            self._heap,
+            (subscription.next_run_at, self._sequence, subscription.generation, subscription.subscription_id),
+        )
+
+    def _pop_due(self, now: float) -> Optional[tuple[Subscription, PaymentData]]:
+        self._drop_stale()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, _, _, subscription_id = heapq.heappop(self._heap)
+        subscription = self._subscriptions[subscription_id]
+        payment_data = subscription.period_payment()
+        subscription.runs += 1
+        # Next period is scheduled from the previous due time, so billing never drifts.
+        subscription.next_run_at += subscription.interval
+        self._push(subscription)
+        return subscription, payment_data
+
+    def _next_due_locked(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap:
+            _, _, generation, subscription_id = heap[0]
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is not None and subscription.active and subscription.generation == generation:
+                return
+            heapq.heappop(heap)
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from payment_service.commons import CustomerData, PaymentData
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A recurring charge of 'payment_data' every 'interval' seconds, next due at 'next_run_at' (epoch seconds)."""
+    subscription_id: str
+    customer_data: CustomerData
+    payment_data: PaymentData
+    interval: float
+    next_run_at: float
+    active: bool = True
+    runs: int = 0
+    # Bumped whenever the subscription is rescheduled or cancelled; older heap entries are skipped.
+    generation: int = 0
+
+    def period_payment(self) -> PaymentData:
+        """Payment data for the current period, with its own idempotency key so each period is charged once."""
+        key = f"sub_{self.subscription_id}_{round(self.next_run_at * 1000)}"
+        return self.payment_data.model_copy(update={"idempotency_key": key})
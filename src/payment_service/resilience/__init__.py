@@ -0,0 +1,15 @@
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .processor import ResilientProcessor
+from .rate_limit import AdaptiveRateLimiter, TokenBucket
+from .retry import RetryPolicy, is_retryable_error, is_unprocessed_error
+
+__all__ = [
+    "AdaptiveRateLimiter",
+    "CircuitBreaker",
+    "CircuitState",
+    "ResilientProcessor",
+    "RetryPolicy",
+    "TokenBucket",
+    "is_retryable_error",
+    "is_unprocessed_error",
+]
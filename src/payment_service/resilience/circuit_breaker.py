@@ -0,0 +1,80 @@
+import threading
+import time
+from enum import Enum
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker.
+
+    Opens after 'failure_threshold' consecutive failures and rejects calls until
+    'recovery_timeout' seconds have passed. It then lets up to 'half_open_max_calls'
+    trial calls through: a success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if self._state is CircuitState.OPEN and self._recovery_elapsed():
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.OPEN:
+                if not self._recovery_elapsed():
+                    return False
+                self._state = CircuitState.HALF_OPEN
+                self._half_open_calls = 0
+            if self._half_open_calls >= self.half_open_max_calls:
+                return False
+            self._half_open_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_cancelled(self):
+        """A call allowed through ended without an outcome (e.g. it was cancelled).
+
+        Gives its half-open trial slot back, so the next call can probe the service again
+        instead of the breaker waiting on a result that never comes.
+        """
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN and self._half_open_calls:
+                self._half_open_calls -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def _recovery_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.recovery_timeout
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+from payment_service.commons import CustomerData, PaymentData, PaymentResponse, current_deadline
+from payment_service.processors.payment import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol
+from payment_service.processors.refunds import AsyncRefundProcessorProtocol, RefundProcessorProtocol
+from .circuit_breaker import CircuitBreaker
+from .retry import RetryPolicy, is_retryable_error, is_unprocessed_error
+
+
+def _circuit_open_response(amount: float) -> PaymentResponse:
+    return PaymentResponse(
+        status="failed",
+        amount=amount,
+        transaction_id=None,
+        message="Payment provider unavailable: circuit breaker is open",
+        retryable=True,
+        not_processed=True,
+    )
+
+
+def _outcome(response: PaymentResponse, maybe_processed: bool) -> PaymentResponse:
+    # After an ambiguous attempt (e.g. a read timeout) the upstream may hold the charge, even if
+    # the last attempt never connected; the caller must not treat the payment as unprocessed.
+    if maybe_processed and response.not_processed:
+        return response.model_copy(update={"not_processed": False})
+    return response
+
+
+def _ambiguous_failure(amount: float, error: Exception) -> PaymentResponse:
+    return PaymentResponse(status="failed", amount=amount, transaction_id=None, message=str(error), retryable=True)
+
+
+@dataclass
+class ResilientProcessor(
+    PaymentProcessorProtocol,
+    RefundProcessorProtocol,
+    AsyncPaymentProcessorProtocol,
+    AsyncRefundProcessorProtocol,
+):
+    """Wraps any payment/refund processor with retries and a circuit breaker.
+
+    A call is retried when the processor raises a retryable error or returns a response
+    marked 'retryable'. Only those transient failures count against the breaker; declines
+    and validation errors mean the provider is healthy. While the breaker is open, calls
+    fail fast with a retryable failed response instead of waiting on the upstream.
+    """
+    processor: Any
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    circuit_breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def available(self) -> bool:
+        return not self.circuit_breaker.is_open
+
+    def process_transaction(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        return self._call(
+            lambda: self.processor.process_transaction(customer_data, payment_data),
+            payment_data.amount,
+        )
+
+    def refund_payment(self, transaction_id: str) -> PaymentResponse:
+        return self._call(lambda: self.processor.refund_payment(transaction_id), 0)
+
+    async def process_transaction_async(self, customer_data: CustomerData, payment_data: PaymentData) -> PaymentResponse:
+        if isinstance(self.processor, AsyncPaymentProcessorProtocol):
+            call = lambda: self.processor.process_transaction_async(customer_data, payment_data)
+        else:
+            call = lambda: asyncio.to_thread(self.processor.process_transaction, customer_data, payment_data)
+        return await self._call_async(call, payment_data.amount)
+
+    async def refund_payment_async(self, transaction_id: str) -> PaymentResponse:
+        if isinstance(self.processor, AsyncRefundProcessorProtocol):
+            call = lambda: self.processor.refund_payment_async(transaction_id)
+        else:
+            call = lambda: asyncio.to_thread(self.processor.refund_payment, transaction_id)
+        return await self._call_async(call, 0)
+
+    def _call(self, call: Callable[[], PaymentResponse], amount: float) -> PaymentResponse:
+        maybe_processed = False
+        for attempt in range(self.retry_policy.max_attempts):
+            if not self.circuit_breaker.allow_request():
+                return _outcome(_circuit_open_response(amount), maybe_processed)
+            try:
+                response = call()
+            except Exception as e:
+                delay = self._retry_delay(self._record_error(e), attempt)
+                if delay is None:
+                    if maybe_processed and is_unprocessed_error(e):
+                        return _ambiguous_failure(amount, e)
+                    raise
+                maybe_processed = maybe_processed or not is_unprocessed_error(e)
+            except BaseException:
+                # Cancelled or interrupted: no outcome to record, but free the trial slot.
+                self.circuit_breaker.record_cancelled()
+                raise
+            else:
+                delay = self._retry_delay(self._record_response(response), attempt)
+                if delay is None:
+                    return _outcome(response, maybe_processed)
+                maybe_processed = maybe_processed or not response.not_processed
+            time.sleep(delay)
+
+    async def _call_async(self, call: Callable[[], Awaitable[PaymentResponse]], amount: float) -> PaymentResponse:
+        maybe_processed = False
+        for attempt in range(self.retry_policy.max_attempts):
+            if not self.circuit_breaker.allow_request():
+                return _outcome(_circuit_open_response(amount), maybe_processed)
+            try:
+                response = await call()
+            except Exception as e:
+                delay = self._retry_delay(self._record_error(e), attempt)
+                if delay is None:
+                    if maybe_processed and is_unprocessed_error(e):
+                        return _ambiguous_failure(amount, e)
+                    raise
+                maybe_processed = maybe_processed or not is_unprocessed_error(e)
+            except BaseException:
+                # Cancelled or interrupted: no outcome to record, but free the trial slot.
+                self.circuit_breaker.record_cancelled()
+                raise
+            else:
+                delay = self._retry_delay(self._record_response(response), attempt)
+                if delay is None:
+                    return _outcome(response, maybe_processed)
+                maybe_processed = maybe_processed or not response.not_processed
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, retryable: bool, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None when the attempts or the deadline are used up."""
+        if not retryable or attempt + 1 >= self.retry_policy.max_attempts:
+            return None
+        delay = self.retry_policy.backoff(attempt)
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= delay:
+            return None
+        return delay
+
+    def _record_response(self, response: PaymentResponse) -> bool:
+        """Update the breaker and return True when the failure is worth retrying."""
+        if not response.retryable:
+            self.circuit_breaker.record_success()
+            return False
+        self.circuit_breaker.record_failure()
+        return True
+
+    def _record_error(self, error: Exception) -> bool:
+        if not is_retryable_error(error):
+            self.circuit_breaker.record_success()
+            return False
+        self.circuit_breaker.record_failure()
+        return True
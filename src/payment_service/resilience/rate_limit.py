@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at 'rate' tokens per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = value
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available and return 0, otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self._rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+
+class AdaptiveRateLimiter:
+    """Separate read and write token buckets that adapt to provider 429 responses.
+
+    Each 429 halves the current rates, at most once per 'cooldown' seconds so a burst of
+    throttled in-flight calls counts once. After that, every successful call adds back
+    'recovery_step' of the configured rate until the ceiling is reached again.
+    """
+
+    def __init__(
+        self,
+        read_rate: float = 100.0,
+        write_rate: float = 100.0,
+        min_rate: float = 1.0,
+        backoff_factor: float = 0.5,
+        recovery_step: float = 0.01,
+        cooldown: float = 1.0,
+    ):
+        self.max_read_rate = read_rate
+        self.max_write_rate = write_rate
+        self.min_rate = min_rate
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+        self.cooldown = cooldown
+        self.read = TokenBucket(read_rate)
+        self.write = TokenBucket(write_rate)
+        self._throttled_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def acquire_read(self, timeout: Optional[float] = None) -> bool:
+        return self.read.acquire(timeout=timeout)
+
+    def acquire_write(self, timeout: Optional[float] = None) -> bool:
+        return self.write.acquire(timeout=timeout)
+
+    async def acquire_read_async(self, timeout: Optional[float] = None) -> bool:
+        return await self.read.acquire_async(timeout=timeout)
+
+    async def acquire_write_async(self, timeout: Optional[float] = None) -> bool:
+        return await self.write.acquire_async(timeout=timeout)
+
+    def record_throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._throttled_at < self.cooldown:
+                return
+            self._throttled_at = now
+            self.read.rate = max(self.min_rate, self.read.rate * self.backoff_factor)
+            self.write.rate = max(self.min_rate, self.write.rate * self.backoff_factor)
+
+    def record_success(self):
+        if self.read.rate >= self.max_read_rate and self.write.rate >= self.max_write_rate:
+            return
+        with self._lock:
+            self.read.rate = min(self.max_read_rate, self.read.rate + self.max_read_rate * self.recovery_step)
+            self.write.rate = min(self.max_write_rate, self.write.rate + self.max_write_rate * self.recovery_step)
@@ -0,0 +1,68 @@
+import random
+import socket
+from dataclasses import dataclass
+from typing import Optional
+from stripe import APIConnectionError, APIError, RateLimitError
+
+# Transport errors raised before a request is sent (httpx, requests and urllib3), matched by
+# name so neither HTTP library has to be importable.
+_CONNECT_ERRORS = frozenset({"ConnectError", "ConnectTimeout", "NewConnectionError"})
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Transient transport and provider errors are worth retrying; card and request errors are not."""
+    if isinstance(error, (APIConnectionError, RateLimitError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, APIError):
+        return error.http_status is None or error.http_status >= 500
+    return False
+
+
+def is_unprocessed_error(error: BaseException) -> bool:
+    """True when the request certainly never reached the provider: a 429 or a failure to connect.
+
+    Read timeouts and dropped connections are ambiguous (the charge may have gone through) and
+    return False.
+    """
+    if isinstance(error, RateLimitError):
+        return True
+    if isinstance(error, APIConnectionError):
+        # Stripe's HTTP clients raise APIConnectionError from the transport's own exception.
+        return _is_connect_failure(error.__cause__)
+    return _is_connect_failure(error)
+
+
+def _is_connect_failure(error: Optional[BaseException]) -> bool:
+    for _ in range(8):
+        if error is None:
+            return False
+        if isinstance(error, (ConnectionRefusedError, socket.gaierror)):
+            return True
+        if any(cls.__name__ in _CONNECT_ERRORS for cls in type(error).__mro__):
+            return True
+        # requests wraps urllib3's MaxRetryError, whose 'reason' is the underlying failure.
+        reason = getattr(error, "reason", None)
+        if isinstance(reason, BaseException):
+            error = reason
+        elif error.args and isinstance(error.args[0], BaseException):
+            error = error.args[0]
+        else:
+            error = error.__cause__
+    return False
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n sleeps uniform(0, min(max_delay, base_delay * 2**n))."""
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+    jitter: bool = True
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, delay) if self.jitter else delay
@@ -1,12 +1,46 @@
-from dataclasses import dataclass
-from typing import Optional, Self
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Iterable, Iterator, Optional, Self
 from stripe import StripeError 
-from .commons import PaymentResponse, PaymentData
-from .processors import PaymentProcessorProtocol, RecurringPaymentProcessorProtocol, RefundProcessorProtocol
-from .notifiers import NotifierProtocol
+from .commons import CustomerData, Deadline, PaymentResponse, PaymentData, deadline_scope
+from .processors import AsyncPaymentProcessorProtocol, PaymentProcessorProtocol, ProcessorRegistry, RecurringPaymentProcessorProtocol, RefundProcessorProtocol, StoreAndForwardProcessor
+from .notifiers import NotificationOutbox, NotifierProtocol
 from .validators import CustomerValidator, PaymentDataValidator
 from .loggers import TransactionLogger 
 from .factory import PaymentProcessorFactory
+from .batch import BatchRunner, CheckpointStore
+from .idempotency import IdempotencyCache, batch_item_idempotency_key, charge_idempotency_key, refund_idempotency_key, unique_charge_key
+from .resilience import is_retryable_error
+
+
+def _failed_response(payment_data: PaymentData, error: Exception, retryable: bool = False) -> PaymentResponse:
+    return PaymentResponse(
+        status="failed",
+        amount=payment_data.amount,
+        transaction_id=None,
+        message=str(error),
+        retryable=retryable,
+    )
+
+
+def _with_idempotency_key(customer_data: CustomerData, payment_data: PaymentData) -> PaymentData:
+    # Pinned once per call so the cache, every retry and the processor all use the same key.
+    if payment_data.idempotency_key:
+        return payment_data
+    key = charge_idempotency_key(customer_data, payment_data) if payment_data.order_id else unique_charge_key()
+    return payment_data.model_copy(update={"idempotency_key": key})
+
+
+def _report_deferred_failure(future: Future):
+    # Nobody waits on side effects that outlive the deadline; without this their errors vanish.
+    error = future.exception()
+    if error is not None:
+        print("Deferred notification or logging failed after the deadline:", error)
+
 
 @dataclass
 class PaymentService:
@@ -19,20 +53,254 @@ class PaymentService:
     logger: TransactionLogger
     recurring_processor: Optional[RecurringPaymentProcessorProtocol] = None
     refund_processor: Optional[RefundProcessorProtocol] = None
+    idempotency_cache: Optional[IdempotencyCache] = None
+    # Share of a transaction deadline kept back for notification and logging after the charge.
+    post_charge_reserve: float = 0.2
+    deferred_executor: Optional[Executor] = None
+    # With an outbox, receipts are recorded durably with the transaction and sent by OutboxDeliveryWorkers.
+    outbox: Optional[NotificationOutbox] = None
+    _deferred_lock: threading.Lock = field(init=False, default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        # Queued charges get their receipt when they settle, not when they are accepted.
+        if isinstance(self.payment_processor, StoreAndForwardProcessor) and self.payment_processor.on_settled is None:
+            self.payment_processor.on_settled = self.on_charge_settled
 
     @classmethod
     def create_with_payment_processor(cls, payment_data: PaymentData, **kwargs) -> Self:
-        try:
-            processor = PaymentProcessorFactory.create_payment_processor(payment_data)
-            return cls(payment_processor=processor, **kwargs)
-        except ValueError as e:
-            print("Error creating PaymentService:", e)
+        """Build a service around the registry's processor for the payment; raises UnsupportedPaymentMethodError."""
+        processor = PaymentProcessorFactory.create_payment_processor(payment_data)
+        return cls(payment_processor=processor, **kwargs)
+
+    @classmethod
+    def create_with_registry(cls, registry: Optional[ProcessorRegistry] = None, **kwargs) -> Self:
+        """One long-lived service that dispatches every payment through the processor registry."""
+        return cls(payment_processor=registry or PaymentProcessorFactory.get_registry(), **kwargs)
 
     def set_notifier(self, notifier: NotifierProtocol):
         print(f"Changing the notifier implementation {notifier.__class__.__name__}")
         self.notifier = notifier
 
-    def process_transaction(self, customer_data, payment_data) -> PaymentResponse:
+    def process_transaction(self, customer_data, payment_data, deadline: Deadline | float | None = None) -> PaymentResponse:
+        """Validate, charge, notify and log.
+
+        Retries are recognised by payment_data.idempotency_key or order_id; a charge with
+        neither is always new. A call arriving while the same charge is in flight waits for
+        its outcome instead of charging (and notifying) again.
+
+        'deadline' (a Deadline or a timeout in seconds) bounds the whole call: the charge runs
+        with a network timeout taken from the budget minus 'post_charge_reserve', and
+        notification/logging still running when the budget is spent finish in the background.
+        """
+        deadline = Deadline.coerce(deadline)
+        self._validate(customer_data, payment_data)
+        payment_data = _with_idempotency_key(customer_data, payment_data)
+        idempotency_key = payment_data.idempotency_key
+        try:
+            cached = self._reserve(idempotency_key, deadline)
+        except TimeoutError as e:
+            return _failed_response(payment_data, e, retryable=True)
+        if cached is not None:
+            return cached
+        charge = None
+        try:
+            charge_deadline = self._charge_deadline(deadline)
+            if charge_deadline is not None and charge_deadline.expired:
+                return _failed_response(payment_data, TimeoutError("Deadline exceeded before charge"), retryable=True)
+            started = time.perf_counter()
+            with deadline_scope(charge_deadline):
+                charge = self.payment_processor.process_transaction(customer_data, payment_data)
+            latency = time.perf_counter() - started
+            self._after_charge(deadline, customer_data, payment_data, charge, latency)
+            return charge
+        except StripeError as e:
+            raise e
+        finally:
+            self._settle_reservation(idempotency_key, charge)
+
+    async def process_transaction_async(self, customer_data, payment_data, deadline: Deadline | float | None = None) -> PaymentResponse:
+        # Same stages as process_transaction, but the charge is awaited on the event loop
+        # and the blocking notifier/logger calls are moved off it.
+        deadline = Deadline.coerce(deadline)
+        self._validate(customer_data, payment_data)
+        payment_data = _with_idempotency_key(customer_data, payment_data)
+        idempotency_key = payment_data.idempotency_key
+        try:
+            cached = await self._reserve_async(idempotency_key, deadline)
+        except TimeoutError as e:
+            return _failed_response(payment_data, e, retryable=True)
+        if cached is not None:
+            return cached
+        charge = None
+        try:
+            charge_deadline = self._charge_deadline(deadline)
+            if charge_deadline is not None and charge_deadline.expired:
+                return _failed_response(payment_data, TimeoutError("Deadline exceeded before charge"), retryable=True)
+            started = time.perf_counter()
+            with deadline_scope(charge_deadline):
+                if isinstance(self.payment_processor, AsyncPaymentProcessorProtocol):
+                    charge = await self.payment_processor.process_transaction_async(customer_data, payment_data)
+                else:
+                    charge = await asyncio.to_thread(self.payment_processor.process_transaction, customer_data, payment_data)
+            latency = time.perf_counter() - started
+            await self._after_charge_async(deadline, customer_data, payment_data, charge, latency)
+            return charge
+        except StripeError as e:
+            raise e
+        finally:
+            self._settle_reservation(idempotency_key, charge)
+
+    def process_batch(
+        self,
+        items: Iterable[tuple[CustomerData, PaymentData]],
+        max_workers: int = 8,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = True,
+        checkpoint: Optional[CheckpointStore] = None,
+    ) -> Iterator[tuple[int, PaymentResponse]]:
+        """Charge every (customer, payment) pair concurrently.
+
+        Yields (index, PaymentResponse) per item, in input order or as completed.
+        Validation and processor errors become failed responses instead of aborting the batch.
+        With a 'checkpoint', rows are tracked by their index in the run: rows it already holds
+        are skipped and new outcomes are recorded, so a crashed run can be restarted with the
+        same store (run_id) and input.
+        """
+        runner = BatchRunner(max_workers=max_workers, max_in_flight=max_in_flight)
+        results = runner.map(partial(self._process_batch_item, checkpoint=checkpoint), enumerate(items), ordered=ordered)
+        if checkpoint is None:
+            return results
+        return self._flush_when_done(results, checkpoint)
+
+    def _process_batch_item(self, row: tuple[int, tuple[CustomerData, PaymentData]], checkpoint: Optional[CheckpointStore] = None) -> PaymentResponse:
+        index, (customer_data, payment_data) = row
+        if checkpoint is not None:
+            # Rows are identified by position within the run, so identical rows are separate charges.
+            item_key = str(index)
+            completed = checkpoint.completed(item_key)
+            if completed is not None:
+                return completed
+            if not payment_data.idempotency_key and not payment_data.order_id:
+                # Stable per row, so a row charged before a crash is recognised when the run resumes.
+                payment_data = payment_data.model_copy(
+                    update={"idempotency_key": batch_item_idempotency_key(checkpoint.run_id, index)}
+                )
+        try:
+            response = self.process_transaction(customer_data, payment_data)
+        except (ValueError, StripeError) as e:
+            response = _failed_response(payment_data, e)
+        except Exception as e:
+            print("Unexpected error in batch item:", e)
+            response = _failed_response(payment_data, e)
+        if checkpoint is not None:
+            checkpoint.mark_done(item_key, response)
+        return response
+
+    @staticmethod
+    def _flush_when_done(results: Iterator[tuple[int, PaymentResponse]], checkpoint: CheckpointStore) -> Iterator[tuple[int, PaymentResponse]]:
+        try:
+            yield from results
+        finally:
+            checkpoint.flush()
+
+    def _charge_deadline(self, deadline: Optional[Deadline]) -> Optional[Deadline]:
+        if deadline is None:
+            return None
+        return deadline.reserve(self.post_charge_reserve)
+
+    def on_charge_settled(self, reference_id: str, customer_data, payment_data, charge: PaymentResponse):
+        """Send the receipt for a queued ('pending') charge once StoreAndForwardProcessor has settled it.
+
+        Hooked up automatically when the service's payment processor is a StoreAndForwardProcessor
+        without an on_settled callback; pass it as 'on_settled' when the processor is wrapped.
+        """
+        self._notify_and_log(customer_data, payment_data, charge)
+
+    def _notify_and_log(self, customer_data, payment_data, charge: PaymentResponse, latency: Optional[float] = None):
+        if charge.status == "pending":
+            # Nothing has been charged yet and there is no transaction id; on_charge_settled sends the receipt.
+            pass
+        elif self.outbox is not None:
+            self.outbox.record(customer_data, payment_data, charge)
+        else:
+            self.notifier.send_notification(customer_data, payment_data, charge.transaction_id)
+        self.logger.log_transaction(
+            customer_data, payment_data, charge, processor=charge.processor or type(self.payment_processor).__name__, latency=latency
+        )
+
+    def _after_charge(self, deadline: Optional[Deadline], customer_data, payment_data, charge: PaymentResponse, latency: float):
+        if deadline is None:
+            self._notify_and_log(customer_data, payment_data, charge, latency)
+            return
+        # The charge result must reach the caller on time: side effects run on the deferred
+        # worker and are only waited for while budget remains, then left to finish there.
+        future = self._deferred().submit(self._notify_and_log, customer_data, payment_data, charge, latency)
+        try:
+            future.result(timeout=deadline.remaining())
+        except FutureTimeoutError:
+            print("Deadline reached: notification and logging continue in the background")
+            future.add_done_callback(_report_deferred_failure)
+
+    async def _after_charge_async(self, deadline: Optional[Deadline], customer_data, payment_data, charge: PaymentResponse, latency: float):
+        if deadline is None:
+            await asyncio.to_thread(self._notify_and_log, customer_data, payment_data, charge, latency)
+            return
+        deferred = self._deferred().submit(self._notify_and_log, customer_data, payment_data, charge, latency)
+        future = asyncio.wrap_future(deferred)
+        done, _ = await asyncio.wait({future}, timeout=deadline.remaining())
+        if future in done:
+            future.result()
+        else:
+            print("Deadline reached: notification and logging continue in the background")
+            deferred.add_done_callback(_report_deferred_failure)
+
+    def _deferred(self) -> Executor:
+        # process_batch reaches this from many threads at once; only one of them may create the pool.
+        with self._deferred_lock:
+            if self.deferred_executor is None:
+                self.deferred_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="deferred")
+            return self.deferred_executor
+
+    def close(self):
+        """Wait for deferred notifications and log writes to finish, then close the outbox, notifier and logger if they hold resources.
+
+        Queueing and coalescing notifiers deliver or flush what they hold before closing, the
+        outbox commits the records it has buffered, and a buffered logger writes out its buffer.
+        """
+        with self._deferred_lock:
+            executor, self.deferred_executor = self.deferred_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for resource in (self.outbox, self.notifier, self.logger):
+            close = getattr(resource, "close", None)
+            if close is not None:
+                close()
+
+    def _reserve(self, idempotency_key: str, deadline: Optional[Deadline] = None) -> Optional[PaymentResponse]:
+        """The cached response for the key, or None once this call owns it (see IdempotencyCache.reserve)."""
+        if self.idempotency_cache is None:
+            return None
+        return self.idempotency_cache.reserve(idempotency_key, None if deadline is None else deadline.remaining())
+
+    async def _reserve_async(self, idempotency_key: str, deadline: Optional[Deadline] = None) -> Optional[PaymentResponse]:
+        if self.idempotency_cache is None:
+            return None
+        owned, cached = self.idempotency_cache.try_reserve(idempotency_key)
+        if owned or cached is not None:
+            return cached
+        # A duplicate is in flight: wait for its outcome off the event loop.
+        return await asyncio.to_thread(self._reserve, idempotency_key, deadline)
+
+    def _settle_reservation(self, idempotency_key: str, response: Optional[PaymentResponse]):
+        # Failures and queued charges are not cached so that a retry sees the final outcome.
+        if self.idempotency_cache is None:
+            return
+        if response is not None and response.status not in ("failed", "pending"):
+            self.idempotency_cache.put(idempotency_key, response)
+        else:
+            self.idempotency_cache.release(idempotency_key)
+
+    def _validate(self, customer_data, payment_data):
         try:
             self.customer_validator.validate(customer_data)
         except ValueError as e:
@@ -41,20 +309,56 @@ class PaymentService:
             self.payment_validator.validate(payment_data)
         except ValueError as e:
             raise e  
-        try:
-            charge = self.payment_processor.process_transaction(customer_data, payment_data)
-            self.notifier.send_notification(customer_data, payment_data, charge.transaction_id)
-            self.logger.log_transaction(customer_data, payment_data, charge)
-            return charge
-        except StripeError as e:
-            raise e
+
     def refund_transaction(self, transaction_id) -> PaymentResponse:
         if self.refund_processor:
-            return self.refund_processor.refund_transaction(transaction_id)
+            idempotency_key = refund_idempotency_key(transaction_id)
+            cached = self._reserve(idempotency_key)
+            if cached is not None:
+                return cached
+            refund = None
+            try:
+                started = time.perf_counter()
+                refund = self.refund_processor.refund_payment(transaction_id)
+                self.logger.log_refund(
+                    transaction_id,
+                    refund,
+                    processor=refund.processor or type(self.refund_processor).__name__,
+                    latency=time.perf_counter() - started,
+                )
+                return refund
+            finally:
+                self._settle_reservation(idempotency_key, refund)
         else:
             raise NotImplementedError("Refunding transactions is not supported by the current payment processor")
+
+    def refund_batch(
+        self,
+        transaction_ids: Iterable[str],
+        max_workers: int = 8,
+        max_in_flight: Optional[int] = None,
+    ) -> dict[str, PaymentResponse]:
+        """Refund many charges concurrently and return one response per transaction id.
+
+        Duplicate ids are refunded once. Re-running after a partial failure is safe: each
+        refund carries an idempotency key derived from its charge id, and charges Stripe
+        reports as already refunded come back as 'already_refunded' rather than failures.
+        """
+        if not self.refund_processor:
+            raise NotImplementedError("Refunding transactions is not supported by the current payment processor")
+        unique_ids = list(dict.fromkeys(transaction_ids))
+        runner = BatchRunner(max_workers=max_workers, max_in_flight=max_in_flight)
+        results = runner.map(self._refund_batch_item, unique_ids, ordered=False)
+        return {unique_ids[index]: refund for index, refund in results}
+
+    def _refund_batch_item(self, transaction_id: str) -> PaymentResponse:
+        try:
+            return self.refund_transaction(transaction_id)
+        except Exception as e:
+            print("Refund failed for", transaction_id, e)
+            return PaymentResponse(status="failed", amount=0, transaction_id=None, message=str(e), retryable=is_retryable_error(e))
     def create_recurring_payment(self, customer_data, payment_data) -> PaymentResponse:
         if self.recurring_processor:
-            return self.recurring_processor.create_recurring_payment(customer_data, payment_data)
+            return self.recurring_processor.setup_recurring_payment(customer_data, payment_data)
         else:
             raise NotImplementedError("Creating recurring payments is not supported by the current payment processor")
\ No newline at end of file